@@ -0,0 +1,147 @@
+import hashlib
+import os
+import struct
+import threading
+import pygame
+
+# Pre-scaled images are kept here between runs
+CACHE_DIR = ".asset_cache"
+CACHE_HEADER = struct.Struct("<4sII")
+CACHE_MAGIC = b"RGBA"
+
+# All images used by the game and their sizes, baked by build_assets
+ASSETS = [
+    ("background.png", (800, 600)),
+    ("hero.png", (50, 60)),
+    ("enemy.png", (50, 40)),
+    ("enemy2.png", (50, 40)),
+    ("flag.png", (50, 60)),
+    ("pixel.png", None),
+    ("bullet.png", (60, 30)),
+    ("coin.png", (40, 40)),
+]
+
+
+def source_hash(name):
+    """
+    Hash of the source file, cached image changes when source changes
+    """
+    with open(name, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()[:16]
+
+
+def cache_path(name, scale_size):
+    """
+    File in the cache for image with given size
+    """
+    size = f"{scale_size[0]}x{scale_size[1]}" if scale_size else "full"
+    base = os.path.splitext(os.path.basename(name))[0]
+    return os.path.join(CACHE_DIR, f"{base}-{source_hash(name)}-{size}.rgba")
+
+
+def read_cached(path):
+    """
+    Image from raw RGBA pixels, None when it is not in the cache
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return None
+    if len(data) < CACHE_HEADER.size:
+        return None
+    magic, width, height = CACHE_HEADER.unpack_from(data)
+    pixels = data[CACHE_HEADER.size:]
+    if magic != CACHE_MAGIC or len(pixels) != width * height * 4:
+        return None
+    return pygame.image.frombuffer(pixels, (width, height), "RGBA")
+
+
+def write_cached(path, image):
+    """
+    Saving raw RGBA pixels of image, file is replaced at once,
+    so other game started at the same time never reads half of it
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    width, height = image.get_size()
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "wb") as file:
+        file.write(CACHE_HEADER.pack(CACHE_MAGIC, width, height))
+        file.write(pygame.image.tobytes(image, "RGBA"))
+    os.replace(temp, path)
+
+
+def load_image(name, scale_size=None):
+    """
+    Function to load all images
+    and its size, it does not need a window.
+    Scaled pixels are taken from the cache when possible
+    """
+    try:
+        path = cache_path(name, scale_size)
+    except OSError:
+        path = None
+    if path:
+        image = read_cached(path)
+        if image is not None:
+            return image
+    image = pygame.image.load(name)
+    if scale_size:
+        image = pygame.transform.scale(image, scale_size)
+    if path:
+        try:
+            write_cached(path, image)
+        except OSError:
+            pass  # Game works without the cache, only starts slower
+    return image
+
+
+def build_assets():
+    """
+    Baking all images into the cache before the first start
+    """
+    for name, scale_size in ASSETS:
+        load_image(name, scale_size)
+        print(f"{name} -> {cache_path(name, scale_size)}")
+
+
+class BackgroundLoader:
+    """
+    Loads assets which are not needed at start in another thread
+    """
+    def __init__(self, jobs):
+        """
+        Jobs is dict with names and functions which load the asset
+        """
+        self.jobs = jobs
+        self.results = {}
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        try:
+            for name, job in self.jobs.items():
+                self.results[name] = job()
+        except Exception as error:  # Shown in the main thread
+            self.error = error
+
+    def ready(self):
+        """
+        True when all assets are loaded
+        """
+        if self.thread.is_alive():
+            return False
+        if self.error is not None:
+            raise self.error
+        return True
+
+    def get(self, name):
+        return self.results[name]
+
+
+if __name__ == "__main__":
+    build_assets()
@@ -0,0 +1,73 @@
+import pygame
+
+
+class BackgroundLayer:
+    """
+    One layer of the background, its tiles are put together
+    into one wide strip, so drawing it is always one blit
+    """
+    def __init__(self, image, screen_size, factor=1.0, mirror=True, color=None):
+        """
+        Every second tile is flipped when mirror is set.
+        With color the layer is put on it and covers the whole screen,
+        otherwise only rows which are not transparent are drawn
+        """
+        self.factor = factor
+        screen_width, screen_height = screen_size
+        tiles = [image, pygame.transform.flip(image, True, False)] if mirror else [image]
+        tile_width = image.get_width()
+        # After one period the tiles repeat, the strip is longer by one screen,
+        # so the visible part never has to be wrapped around
+        self.period = tile_width * len(tiles)
+        count = len(tiles) * ((self.period + screen_width) // self.period + 1)
+        if color is None:
+            strip = pygame.Surface((tile_width * count, image.get_height()), pygame.SRCALPHA).convert_alpha()
+            strip.fill((0, 0, 0, 0))
+        else:
+            strip = pygame.Surface((tile_width * count, screen_height)).convert()
+            strip.fill(color)
+        for i in range(count):
+            strip.blit(tiles[i % len(tiles)], (i * tile_width, 0))
+        if color is None:
+            rows = strip.get_bounding_rect()
+            self.top = rows.top
+            strip = strip.subsurface((0, rows.top, strip.get_width(), rows.height))
+        else:
+            self.top = 0
+        self.strip = strip
+        self.size = (screen_width, min(strip.get_height(), screen_height - self.top))
+
+    def draw(self, surface, scroll_x):
+        offset = int(scroll_x * self.factor) % self.period
+        surface.blit(self.strip, (0, self.top), (offset, 0) + self.size)
+
+
+class Background:
+    """
+    Layers from the back to the front, each moves with its own
+    part of the camera speed
+    """
+    def __init__(self, screen_size, color):
+        """
+        Color is seen where the first layer does not cover the screen
+        """
+        self.screen_size = screen_size
+        self.color = color
+        self.layers = []
+
+    def add_layer(self, image, factor=1.0, mirror=True):
+        """
+        First layer is put on the color once, so the screen does not need filling
+        """
+        color = self.color if not self.layers else None
+        self.layers.append(BackgroundLayer(image, self.screen_size, factor, mirror, color))
+
+    def draw(self, surface, scroll_x, layers=None):
+        """
+        Only the first layers are drawn when layers is given
+        """
+        drawn = self.layers if layers is None else self.layers[:layers]
+        if not drawn:
+            surface.fill(self.color)
+        for layer in drawn:
+            layer.draw(surface, scroll_x)
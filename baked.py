@@ -0,0 +1,59 @@
+import pygame
+
+# Color which is not drawn, places of baked chunks without platforms,
+# platform texture has no black pixels
+COLOR_KEY = (0, 0, 0)
+# Chunks further from the screen than this many chunks are removed
+BAKE_KEEP = 1
+
+
+class BakedGeometry:
+    """
+    Platforms which never move drawn into chunks of the size of the screen,
+    a chunk is made once, so all platforms on the screen are one or two blits
+    """
+    def __init__(self, screen_size, keep=BAKE_KEEP):
+        """
+        Nothing is baked yet
+        """
+        self.width, self.height = screen_size
+        self.keep = keep
+        self.chunks = {}
+        self.level = None
+
+    def bake(self, index, platforms):
+        """
+        Drawing static platforms of the chunk index into one surface,
+        their images come from the image cache, one for every size
+        """
+        left = index * self.width
+        chunk = pygame.Surface((self.width, self.height)).convert()
+        chunk.fill(COLOR_KEY)
+        for platform in platforms.collide(pygame.Rect(left, 0, self.width, self.height)):
+            if platform.static:
+                chunk.blit(platform.image, (platform.rect.x - left, platform.rect.y))
+        chunk.set_colorkey(COLOR_KEY, pygame.RLEACCEL)
+        return chunk
+
+    def draw(self, surface, scroll_x, platforms, level):
+        """
+        Chunks on the screen, the next one is baked before it is seen.
+        Chunks are made again for a new level
+        """
+        if level is not self.level:
+            self.chunks.clear()
+            self.level = level
+        scroll = int(scroll_x)
+        first = scroll // self.width
+        last = (scroll + self.width - 1) // self.width
+        for index in range(first, last + 1):
+            chunk = self.chunks.get(index)
+            if chunk is None:
+                chunk = self.chunks[index] = self.bake(index, platforms)
+            surface.blit(chunk, (index * self.width - scroll, 0))
+        for index in (last + 1, first - 1):
+            if index not in self.chunks:
+                self.chunks[index] = self.bake(index, platforms)
+                break
+        for index in [index for index in self.chunks if not first - self.keep <= index <= last + self.keep]:
+            del self.chunks[index]
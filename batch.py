@@ -0,0 +1,169 @@
+import numpy as np
+
+# Arrays of a batch grow by doubling from this size
+BATCH_CAPACITY = 64
+
+
+def round_rect(values):
+    """
+    Rounding floats like pygame does when they are put into rect,
+    halves go away from zero
+    """
+    whole = np.trunc(values)
+    return (whole + np.sign(values) * (np.abs(values - whole) >= 0.5)).astype(np.int64)
+
+
+class SpriteBatch:
+    """
+    Sprites moved together by numpy arrays instead of their update.
+    Rects of sprites are changed only when something can touch them,
+    the rest keep their old rects until then
+    """
+    # Extra arrays of subclasses, name and dtype
+    FIELDS = {}
+
+    def __init__(self, capacity=BATCH_CAPACITY):
+        """
+        Empty batch
+        """
+        self.count = 0
+        self.sprites = []
+        self.allocate(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def allocate(self, capacity):
+        """
+        Making arrays bigger, old values are kept
+        """
+        fields = {
+            "x": np.float64, "y": np.float64,
+            "width": np.int64, "height": np.int64,
+            # Where the rect of the sprite is now
+            "shown_x": np.int64, "shown_y": np.int64,
+        }
+        fields.update(self.FIELDS)
+        old = self.count
+        for name, dtype in fields.items():
+            array = np.zeros(capacity, dtype=dtype)
+            if old:
+                array[:old] = getattr(self, name)[:old]
+            setattr(self, name, array)
+        self.fields = list(fields)
+        self.capacity = capacity
+
+    def add(self, sprite, **values):
+        """
+        Adding sprite, its position is taken from its rect,
+        values are for arrays of the subclass
+        """
+        if self.count == self.capacity:
+            self.allocate(self.capacity * 2)
+        i = self.count
+        self.x[i] = self.shown_x[i] = sprite.rect.x
+        self.y[i] = self.shown_y[i] = sprite.rect.y
+        self.width[i] = sprite.rect.width
+        self.height[i] = sprite.rect.height
+        for name, value in values.items():
+            getattr(self, name)[i] = value
+        sprite.batch_index = i
+        self.sprites.append(sprite)
+        self.count += 1
+
+    def remove(self, sprite):
+        """
+        Removing sprite, the last one takes its place.
+        Sprite can be killed twice in one tick, then nothing happens
+        """
+        i = getattr(sprite, "batch_index", None)
+        if i is None or i >= self.count or self.sprites[i] is not sprite:
+            return
+        sprite.batch_index = None
+        last = self.count - 1
+        if i != last:
+            for name in self.fields:
+                array = getattr(self, name)
+                array[i] = array[last]
+            moved = self.sprites[last]
+            moved.batch_index = i
+            self.sprites[i] = moved
+        self.sprites.pop()
+        self.count = last
+
+    def clear(self):
+        self.sprites.clear()
+        self.count = 0
+
+    def save_state(self, numbers):
+        """
+        Record numbers of sprites and copies of arrays, for snapshots of the world,
+        only sprites whose numbers are in numbers are saved
+        """
+        rows = [i for i, sprite in enumerate(self.sprites) if sprite.record_number in numbers]
+        return [self.sprites[i].record_number for i in rows], {name: getattr(self, name)[rows] for name in self.fields}
+
+    def load_state(self, state, sprites):
+        """
+        Putting arrays from save_state back into the same arrays,
+        sprites gives the sprite of every record number
+        """
+        numbers, arrays = state
+        n = len(numbers)
+        if n > self.capacity:
+            capacity = self.capacity
+            while capacity < n:
+                capacity *= 2
+            self.count = 0
+            self.allocate(capacity)
+        for name, array in arrays.items():
+            getattr(self, name)[:n] = array
+        self.sprites[:] = [sprites[number] for number in numbers]
+        for i, sprite in enumerate(self.sprites):
+            sprite.batch_index = i
+        self.count = n
+
+    def position(self, sprite):
+        """
+        Real place of sprite, its rect can be old
+        """
+        i = sprite.batch_index
+        return float(self.x[i]), float(self.y[i])
+
+    def place(self, sprite, x, y):
+        """
+        Putting sprite to (x, y), e.g. when it is made again from saved state
+        """
+        i = sprite.batch_index
+        self.x[i] = x
+        self.y[i] = y
+        sprite.rect.x = self.shown_x[i] = int(x)
+        sprite.rect.y = self.shown_y[i] = int(y)
+
+    def touched(self, rect_x, rect_y, rects):
+        """
+        Indexes of sprites which moved since their rects were changed
+        and are or were inside any of rects, their sprites must get new rects
+        """
+        n = self.count
+        shown_x = self.shown_x[:n]
+        shown_y = self.shown_y[:n]
+        moved = np.flatnonzero((rect_x != shown_x) | (rect_y != shown_y))
+        if len(moved) == 0 or not rects:
+            return moved[:0]
+        new_x = rect_x[moved]
+        new_y = rect_y[moved]
+        old_x = shown_x[moved]
+        old_y = shown_y[moved]
+        # Box around the old and the new rect, old rect must go away too
+        left = np.minimum(new_x, old_x)
+        right = np.maximum(new_x, old_x) + self.width[moved]
+        top = np.minimum(new_y, old_y)
+        bottom = np.maximum(new_y, old_y) + self.height[moved]
+        # Every row is one of rects, every column one sprite
+        edges = np.array([(rect.left, rect.right, rect.top, rect.bottom) for rect in rects]).T[:, :, None]
+        inside = (left < edges[1]) & (right > edges[0]) & (top < edges[3]) & (bottom > edges[2])
+        synced = moved[inside.any(axis=0)]
+        shown_x[synced] = rect_x[synced]
+        shown_y[synced] = rect_y[synced]
+        return synced
@@ -0,0 +1,284 @@
+import os
+# Benchmark runs without real window and sound card
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import numpy as np
+import pygame
+from world import World, Inputs, MAP_LENGTH, SCREEN_WIDTH, SCREEN_HEIGHT, convert_images
+from level import Level, PLATFORM, MOVING_X, MOVING_Y, ENEMY, FLYER, COIN, GOAL
+from replay import load_replay, replay_inputs
+from memory import memory_report
+from text import TextCache
+from present import Presenter
+from view import GameView, UI_FONT, AMMO_FONT
+from profiler import FrameProfiler
+
+# Sizes of synthetic levels
+SCENARIOS = {
+    "small": {"platforms": 200, "enemies": 20, "flyers": 5, "coins": 50, "particles": 500},
+    "medium": {"platforms": 10000, "enemies": 1000, "flyers": 100, "coins": 2000, "particles": 5000},
+    "large": {"platforms": 50000, "enemies": 5000, "flyers": 500, "coins": 10000, "particles": 50000},
+}
+# Phases of the benchmark are put together from marks of the frame profiler,
+# the world and the view mark them like in the game. Particles added by
+# the benchmark are marked as events, they are what the game does before the world
+PHASES = {
+    "spawn": ["events"],
+    "update": ["update"],
+    "collision": ["collide_bullets", "collide_coins", "collide_enemies", "collide_goal"],
+    "checkpoint": ["checkpoint"],
+    "render": ["background", "geometry", "sprites", "particles", "hud"],
+    "present": ["present"],
+}
+# Memory blocks are counted between the parts the benchmark calls itself
+BLOCK_PARTS = ["spawn", "step", "render", "present"]
+BENCH_TICKS = 600
+BENCH_SEED = 1
+# No enemies near the start, so the hero does not die at once after restart
+SAFE_START = 800
+
+
+def make_level(platforms, enemies, flyers, coins, seed=BENCH_SEED, length=MAP_LENGTH):
+    """
+    Random level with given number of objects,
+    it has ground along the whole map, so the hero can run
+    """
+    rng = random.Random(seed)
+    records = []
+    for x in range(0, length + 400, 400):
+        records.append((PLATFORM, x, 500, 400, 50, 0, 0, 0.0))
+    floating = []
+    for _ in range(max(platforms - len(records), 0)):
+        x = rng.randint(0, length)
+        y = rng.randint(50, 420)
+        w = rng.randint(40, 300)
+        h = rng.randint(10, 30)
+        roll = rng.random()
+        if roll < 0.03:
+            records.append((MOVING_X, x, y, w, h, rng.randint(50, 300), rng.randint(1, 3), 0.0))
+        elif roll < 0.05:
+            records.append((MOVING_Y, x, y, w, h, rng.randint(50, 150), rng.randint(1, 4), 0.0))
+        else:
+            records.append((PLATFORM, x, y, w, h, 0, 0, 0.0))
+            if x >= SAFE_START:
+                floating.append((x, y, w))
+    # Enemies walk on floating platforms
+    for _ in range(enemies):
+        x, y, w = rng.choice(floating) if floating else (rng.randint(SAFE_START, length), 500, 400)
+        records.append((ENEMY, x, y, 0, 0, max(w - 50, 0), rng.randint(1, 4), 0.0))
+    for _ in range(flyers):
+        records.append((FLYER, rng.randint(1000, length), rng.randint(0, 300), 0, 0, 0, 0, rng.uniform(1.0, 3.5)))
+    for _ in range(coins):
+        records.append((COIN, rng.randint(0, length), rng.randint(50, 450), 0, 0, 0, 0, 0.0))
+    records.append((GOAL, length, 200, 0, 0, 0, 0, 0.0))
+    return Level.from_records(records)
+
+
+def script(tick):
+    """
+    Buttons pressed by scripted player: running right,
+    jumping and shooting from time to time, sometimes going back
+    """
+    back = tick % 240 >= 200
+    return Inputs(left=back, right=not back, up=tick % 40 == 0, space=tick % 30 == 0)
+
+
+def summary(samples):
+    """
+    Statistics of list of times in milliseconds
+    """
+    if not samples:
+        return {"count": 0}
+    values = np.array(samples)
+    return {
+        "count": len(values),
+        "total_ms": round(float(values.sum()), 3),
+        "mean_ms": round(float(values.mean()), 4),
+        "p50_ms": round(float(np.percentile(values, 50)), 4),
+        "p95_ms": round(float(np.percentile(values, 95)), 4),
+        "p99_ms": round(float(np.percentile(values, 99)), 4),
+        "max_ms": round(float(values.max()), 4),
+    }
+
+
+def make_view():
+    """
+    Window and drawing of the game, the same as main.py makes them
+    """
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    # Images can be converted now, when the window exists
+    convert_images()
+    fonts = pygame.font.SysFont(*UI_FONT), pygame.font.SysFont(*AMMO_FONT)
+    return GameView(screen, Presenter(), TextCache(), *fonts)
+
+
+def measure(world, view, inputs, particles=0, restart=True):
+    """
+    Playing world with inputs of every tick, drawing it with view
+    and measuring every phase, with restart the hero starts again at once after death
+    """
+    profiler = FrameProfiler()
+    world.profiler = profiler
+    times = {phase: [] for phase in PHASES}
+    blocks = dict.fromkeys(BLOCK_PARTS, 0)
+    restarts = 0
+    # Ticks which started the game again, they are not in phases
+    restart_times = []
+    max_sprites = 0
+    collections = sum(stat["collections"] for stat in gc.get_stats())
+    started = time.perf_counter()
+    for tick_inputs in inputs:
+        if world.game_state != "GAME":
+            before = time.perf_counter()
+            world.step(Inputs(space=True) if restart else tick_inputs)
+            if world.game_state == "GAME":
+                restart_times.append((time.perf_counter() - before) * 1000)
+                restarts += 1
+            continue
+        profiler.begin_frame()
+        counted = [sys.getallocatedblocks()]
+        # Keeping number of living particles near the target
+        missing = particles - world.particles.count
+        if missing > 0:
+            x = int(world.scroll_x) + random.randint(0, SCREEN_WIDTH)
+            world.particles.emit(x, random.randint(0, 400), "gold", min(missing, max(particles // 20, 1)))
+        profiler.mark("events")
+        counted.append(sys.getallocatedblocks())
+        # The real step of the world, it marks its own phases
+        world.step(tick_inputs)
+        counted.append(sys.getallocatedblocks())
+        scroll_x = view.draw(world)
+        counted.append(sys.getallocatedblocks())
+        view.presenter.present_game(scroll_x)
+        profiler.mark("present")
+        counted.append(sys.getallocatedblocks())
+        for part, before, after in zip(BLOCK_PARTS, counted, counted[1:]):
+            blocks[part] += max(after - before, 0)
+        frame = profiler.frame
+        profiler.end_frame()
+        for phase, marks in PHASES.items():
+            times[phase].append(sum(frame[mark] for mark in marks))
+        max_sprites = max(max_sprites, len(world.all_sprites))
+    wall = time.perf_counter() - started
+    world.profiler = None
+
+    return {
+        "phases": {phase: summary(times[phase]) for phase in PHASES},
+        "allocated_blocks": blocks,
+        "gc_collections": sum(stat["collections"] for stat in gc.get_stats()) - collections,
+        "restarts": restarts,
+        "restart": summary(restart_times),
+        "sprites": len(world.all_sprites),
+        "max_sprites": max_sprites,
+        "chunks": len(world.chunks),
+        "pools": world.pool_stats(),
+        "wall_s": round(wall, 3),
+        "ticks_per_s": round(len(inputs) / wall, 1) if wall else None,
+    }
+
+
+def run(view, name, platforms, enemies, flyers, coins, particles, ticks=BENCH_TICKS, seed=BENCH_SEED,
+        length=MAP_LENGTH, memory=False):
+    """
+    Playing one scenario for ticks with scripted inputs,
+    with memory the memory of the world at the end is reported
+    """
+    random.seed(seed)
+    level = make_level(platforms, enemies, flyers, coins, seed, length)
+    world = World(level=level, seed=seed)
+    world.step(Inputs(space=True))
+    result = {
+        "scenario": name,
+        "params": {"platforms": platforms, "enemies": enemies, "flyers": flyers,
+                   "coins": coins, "particles": particles, "ticks": ticks, "seed": seed, "length": length},
+    }
+    result.update(measure(world, view, [script(tick) for tick in range(ticks)], particles))
+    if memory:
+        result["memory"] = memory_report(world)
+    return result
+
+
+def run_replay(view, path, memory=False):
+    """
+    Playing recorded game (main.py --record) with the same seed
+    """
+    seed, masks, digest = load_replay(path)
+    world = World(seed=seed)
+    result = {"scenario": path, "params": {"ticks": len(masks), "seed": seed}}
+    result.update(measure(world, view, replay_inputs(masks), restart=False))
+    if memory:
+        result["memory"] = memory_report(world)
+    return result
+
+
+def environment():
+    """
+    Versions and machine, results are comparable only on the same setup
+    """
+    return {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless benchmark of Sky wars")
+    parser.add_argument("scenarios", nargs="*", help="names of scenarios to run, all when none is given")
+    parser.add_argument("--ticks", type=int, default=BENCH_TICKS)
+    parser.add_argument("--seed", type=int, default=BENCH_SEED)
+    parser.add_argument("--platforms", type=int, help="custom scenario instead of named ones")
+    parser.add_argument("--enemies", type=int, default=0)
+    parser.add_argument("--flyers", type=int, default=0)
+    parser.add_argument("--coins", type=int, default=0)
+    parser.add_argument("--particles", type=int, default=0)
+    parser.add_argument("--length", type=int, default=MAP_LENGTH, help="length of synthetic levels in pixels")
+    parser.add_argument("--replay", action="append", default=[], help="recorded game used as workload")
+    parser.add_argument("--memory", action="store_true", help="report memory of sprites, groups and arrays at the end")
+    parser.add_argument("--output", help="JSON file for results, printed when not given")
+    return parser.parse_args(argv)
+
+
+def bench(argv=None):
+    """
+    Running benchmark and writing results as JSON
+    """
+    args = parse_args(argv)
+    if args.platforms is not None:
+        scenarios = {"custom": {"platforms": args.platforms, "enemies": args.enemies, "flyers": args.flyers,
+                                "coins": args.coins, "particles": args.particles}}
+    elif args.replay and not args.scenarios:
+        scenarios = {}
+    else:
+        scenarios = {name: SCENARIOS[name] for name in args.scenarios or SCENARIOS}
+    view = make_view()
+    results = {"environment": environment(), "results": []}
+    for name, params in scenarios.items():
+        results["results"].append(run(view, name, ticks=args.ticks, seed=args.seed, length=args.length,
+                                      memory=args.memory, **params))
+    for path in args.replay:
+        results["results"].append(run_replay(view, path, args.memory))
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    return results
+
+
+if __name__ == "__main__":
+    bench()
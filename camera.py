@@ -0,0 +1,79 @@
+import pygame
+from spatial import SpatialGroup, CELL_SIZE
+
+# Extra space around the screen where sprites are still drawn
+DRAW_MARGIN = 100
+# How far from the screen sprites are still updated,
+# it must be bigger than DRAW_MARGIN plus the longest patrol,
+# so everything visible is always awake
+ACTIVITY_RADIUS = 1200
+
+
+def camera_rect(scroll_x, width, height, margin=0):
+    """
+    Part of the world seen by the camera,
+    grown by margin on every side
+    """
+    return pygame.Rect(int(scroll_x) - margin, -margin, width + 2 * margin, height + 2 * margin)
+
+
+class ActivityGroup(SpatialGroup):
+    """
+    Group which updates only sprites near the camera,
+    the rest of them sleep and catch up when they wake
+    """
+    def __init__(self, *sprites, cell_size=CELL_SIZE):
+        """
+        Creating group, sprites with always_active are never put to sleep,
+        passive sprites are moved by something else and never updated here
+        """
+        self.tick = 0
+        self.last_tick = {}
+        self.always = {}
+        # Sprites which are not passive, only they can be updated
+        self.movers = {}
+        # How many sprites were updated in the last tick
+        self.awake = 0
+        super().__init__(*sprites, cell_size=cell_size)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.last_tick[sprite] = self.tick
+        if getattr(sprite, "always_active", False):
+            self.always[sprite] = None
+        if not getattr(sprite, "passive", False):
+            self.movers[sprite] = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        del self.last_tick[sprite]
+        self.always.pop(sprite, None)
+        self.movers.pop(sprite, None)
+
+    def update_active(self, active_rect):
+        """
+        Updating sprites inside active_rect,
+        sprites waking up first replay the ticks they slept through
+        """
+        self.tick += 1
+        always = self.always
+        active = [sprite for sprite in self.movers if sprite in always or active_rect.colliderect(sprite.rect)]
+        self.awake = len(active)
+        active.sort(key=self.grid.order.__getitem__)
+        for sprite in active:
+            # Sprite could be killed by something updated before it
+            if sprite not in self.last_tick:
+                continue
+            slept = self.tick - 1 - self.last_tick[sprite]
+            if slept > 0 and hasattr(sprite, "catch_up"):
+                sprite.catch_up(slept)
+            sprite.update()
+            if sprite in self.last_tick:
+                self.last_tick[sprite] = self.tick
+                self.grid.move(sprite)
+
+    def visible(self, view_rect):
+        """
+        Sprites to draw, in the same order as they were added
+        """
+        return self.grid.query(view_rect)
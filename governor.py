@@ -0,0 +1,92 @@
+from collections import deque, namedtuple
+from profiler import FRAME_BUDGET
+
+# What is drawn on one level of quality: part of particles which are made,
+# part of their life, whether particles outside the screen live on,
+# and how many background layers are drawn (None is all of them)
+Quality = namedtuple("Quality", ["particles", "life", "offscreen", "layers"])
+# From the best quality to the cheapest one
+QUALITY_LEVELS = [
+    Quality(1.0, 1.0, True, None),
+    Quality(0.6, 0.8, True, None),
+    Quality(0.3, 0.6, False, None),
+    Quality(0.1, 0.5, False, 0),
+]
+# Frames in the window, their average work time is compared with the budget
+GOVERNOR_WINDOW = 30
+# Quality goes down above this part of the budget, and up below the other one,
+# the gap between them keeps it from jumping up and down
+LOWER_ABOVE = 0.9
+RAISE_BELOW = 0.5
+# Frames at one level before quality can go up again,
+# every time it has to go down soon after going up it waits twice as long
+RAISE_DELAY = 120
+MAX_RAISE_DELAY = 3600
+# Decisions which are kept for logging
+DECISION_HISTORY = 32
+
+
+class QualityGovernor:
+    """
+    Watches how long frames take without waiting and lowers quality of effects
+    when they do not fit into the budget, when there is time left it raises it again.
+    Only effects change, the world runs the same on every level
+    """
+    def __init__(self, budget=FRAME_BUDGET, levels=QUALITY_LEVELS, window=GOVERNOR_WINDOW):
+        """
+        Budget is work time of one frame in milliseconds, starts at the best level
+        """
+        self.budget = budget
+        self.levels = levels
+        self.level = 0
+        self.times = deque(maxlen=window)
+        self.frame = 0
+        # Frame of the last change and how long to wait before going up
+        self.changed = 0
+        self.raise_delay = RAISE_DELAY
+        # (frame, old level, new level, average ms) of the last changes
+        self.decisions = deque(maxlen=DECISION_HISTORY)
+
+    @property
+    def quality(self):
+        return self.levels[self.level]
+
+    def add_frame(self, work):
+        """
+        Work time of one frame (in milliseconds),
+        returns True when quality changed
+        """
+        self.frame += 1
+        self.times.append(work)
+        if len(self.times) < self.times.maxlen:
+            return False
+        average = sum(self.times) / len(self.times)
+        level = self.level
+        if average > self.budget * LOWER_ABOVE and level < len(self.levels) - 1:
+            # Going up did not work out, next time it waits longer
+            if self.decisions and self.decisions[-1][2] < self.decisions[-1][1] \
+                    and self.frame - self.changed < self.raise_delay:
+                self.raise_delay = min(self.raise_delay * 2, MAX_RAISE_DELAY)
+            level += 1
+        elif average < self.budget * RAISE_BELOW and level > 0 and self.frame - self.changed >= self.raise_delay:
+            level -= 1
+        else:
+            return False
+        self.decisions.append((self.frame, self.level, level, round(average, 3)))
+        self.level = level
+        self.changed = self.frame
+        # Frames of the old level say nothing about the new one
+        self.times.clear()
+        return True
+
+    def stats(self):
+        """
+        Current level and last decisions, for logs
+        """
+        return {
+            "level": self.level,
+            "quality": self.quality._asdict(),
+            "budget_ms": round(self.budget, 3),
+            "raise_delay": self.raise_delay,
+            "decisions": [dict(zip(("frame", "old", "new", "average_ms"), decision)) for decision in self.decisions],
+        }
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+import pygame
+
+# How much memory can be used by rarely used images (in bytes)
+IMAGE_CACHE_BYTES = 16 * 1024 * 1024
+
+
+def image_bytes(image):
+    """
+    Memory used by pixels of the image
+    """
+    return image.get_width() * image.get_height() * image.get_bytesize()
+
+
+class ImageCache:
+    """
+    Shared place for all images and their scaled, flipped
+    and rotated versions, so they are made only once
+    """
+    def __init__(self, max_bytes=IMAGE_CACHE_BYTES):
+        """
+        Empty cache, preloaded versions are never removed,
+        the rest of them are removed when not used for a long time
+        """
+        self.max_bytes = max_bytes
+        self.sources = {}
+        self.fixed = {}
+        self.variants = OrderedDict()
+        self.used_bytes = 0
+
+    def add(self, name, image):
+        """
+        Adding original image of asset
+        """
+        self.sources[name] = image
+
+    def make(self, key):
+        """
+        Creating new version of image
+        """
+        name, scale, flip_x, flip_y, rotation = key
+        image = self.sources[name]
+        if scale:
+            image = pygame.transform.scale(image, scale)
+        if flip_x or flip_y:
+            image = pygame.transform.flip(image, flip_x, flip_y)
+        if rotation:
+            image = pygame.transform.rotate(image, rotation)
+        return image
+
+    def preload(self, name, scale=None, flip_x=False, flip_y=False, rotation=0):
+        """
+        Making common version at load time, it is kept forever
+        """
+        key = (name, scale, flip_x, flip_y, rotation)
+        if key not in self.fixed:
+            self.fixed[key] = self.make(key)
+        return self.fixed[key]
+
+    def get(self, name, scale=None, flip_x=False, flip_y=False, rotation=0):
+        """
+        Returns version of image, it is made only when needed
+        """
+        if not (scale or flip_x or flip_y or rotation):
+            return self.sources[name]
+        key = (name, scale, flip_x, flip_y, rotation)
+        image = self.fixed.get(key)
+        if image is not None:
+            return image
+        image = self.variants.get(key)
+        if image is not None:
+            self.variants.move_to_end(key)
+            return image
+        image = self.make(key)
+        self.variants[key] = image
+        self.used_bytes += image_bytes(image)
+        # Removing the least recently used versions
+        while self.used_bytes > self.max_bytes and len(self.variants) > 1:
+            _, old = self.variants.popitem(last=False)
+            self.used_bytes -= image_bytes(old)
+        return image
+
+    def convert(self):
+        """
+        Converting all images for faster drawing,
+        it can be used only when the window exists
+        """
+        for name, image in self.sources.items():
+            self.sources[name] = image.convert_alpha()
+        for key in self.fixed:
+            self.fixed[key] = self.make(key)
+        self.variants.clear()
+        self.used_bytes = 0
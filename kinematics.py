@@ -0,0 +1,176 @@
+import math
+import numpy as np
+from batch import SpriteBatch, round_rect
+
+# Kinds of movement
+PATROL_X = 0
+PATROL_Y = 1
+BOB = 2
+# Coins move up and down by this many pixels, timer grows by BOB_STEP every tick
+BOB_HEIGHT = 5
+BOB_STEP = 0.1
+# Sine table is made for this many ticks and grows when the game is longer
+SINE_TABLE_SIZE = 4096
+
+
+def patrol_after(position, direction, start, distance, speed, ticks):
+    """
+    Place and direction of a patrol after ticks steps, the same as stepping it
+    one tick at a time gives. Whole ways between turns are counted at once,
+    after the second turn the patrol only goes around, full rounds are skipped
+    """
+    if speed <= 0 or distance < 0:
+        # Such patrols do not go around, they are stepped one by one
+        for _ in range(ticks):
+            position += speed * direction
+            if position > start + distance:
+                direction = -1
+            elif position < start:
+                direction = 1
+        return position, direction
+    end = start + distance
+    turns = 0
+    while ticks > 0:
+        # Steps until the patrol goes past the end it walks to
+        if direction > 0:
+            steps = max((end - position) // speed + 1, 1)
+        else:
+            steps = max((position - start) // speed + 1, 1)
+        if steps > ticks:
+            return position + speed * direction * ticks, direction
+        position += speed * direction * steps
+        direction = -direction
+        ticks -= steps
+        turns += 1
+        if turns == 2:
+            # Going to the other end and back takes the same steps every round
+            if direction > 0:
+                ticks %= 2 * ((end - position) // speed + 1)
+            else:
+                ticks %= 2 * ((position - start) // speed + 1)
+    return position, direction
+
+
+class Kinematics(SpriteBatch):
+    """
+    Simple movements of many sprites in one step:
+    patrols of enemies and moving platforms go between start and start + distance,
+    coins bob up and down
+    """
+    FIELDS = {
+        "kind": np.uint8,
+        "start": np.float64,
+        "distance": np.float64,
+        "speed": np.float64,
+        "direction": np.float64,
+        "ticks": np.int64,
+        # Pixels the rect of a patrol moved in the last step
+        "last_move": np.int64,
+    }
+
+    def __init__(self, **kwargs):
+        """
+        Empty engine
+        """
+        super().__init__(**kwargs)
+        self.sine = np.zeros(0)
+        # Indexes of every kind of movement, made again when sprites change
+        self.kinds = None
+
+    def add(self, sprite, **values):
+        super().add(sprite, **values)
+        self.kinds = None
+
+    def remove(self, sprite):
+        super().remove(sprite)
+        self.kinds = None
+
+    def clear(self):
+        super().clear()
+        self.kinds = None
+
+    def load_state(self, state, sprites):
+        super().load_state(state, sprites)
+        self.kinds = None
+
+    def add_patrol(self, sprite, kind, start, distance, speed, direction):
+        self.add(sprite, kind=kind, start=start, distance=distance, speed=speed, direction=direction)
+
+    def add_bob(self, sprite, start, ticks):
+        """
+        Start is y around which the coin moves, ticks is its timer
+        """
+        self.add(sprite, kind=BOB, start=start, ticks=ticks)
+
+    def sine_table(self, ticks):
+        """
+        Offsets of coins for every tick up to ticks, same numbers as math.sin gives
+        """
+        if ticks >= len(self.sine):
+            size = max(SINE_TABLE_SIZE, len(self.sine))
+            while size <= ticks:
+                size *= 2
+            self.sine = np.array([math.sin(tick * BOB_STEP) * BOB_HEIGHT for tick in range(size)])
+        return self.sine
+
+    def step(self):
+        """
+        Moving everything by one tick
+        """
+        n = self.count
+        if n == 0:
+            return
+        if self.kinds is None:
+            kind = self.kind[:n]
+            self.kinds = {name: np.flatnonzero(kind == name) for name in (PATROL_X, PATROL_Y, BOB)}
+        for patrol, position in ((PATROL_X, self.x), (PATROL_Y, self.y)):
+            moving = self.kinds[patrol]
+            if len(moving) == 0:
+                continue
+            start = self.start[moving]
+            direction = self.direction[moving]
+            old = position[moving]
+            new = old + self.speed[moving] * direction
+            # Turning back after going past the end, or before the start
+            direction = np.where(new > start + self.distance[moving], -1.0,
+                                 np.where(new < start, 1.0, direction))
+            # Rects take the whole part of positions, so they move by the difference of it
+            self.last_move[moving] = new.astype(np.int64) - old.astype(np.int64)
+            position[moving] = new
+            self.direction[moving] = direction
+
+        bobbing = self.kinds[BOB]
+        if len(bobbing):
+            ticks = self.ticks[bobbing] + 1
+            self.ticks[bobbing] = ticks
+            sine = self.sine_table(int(ticks.max()))
+            self.y[bobbing] = round_rect(self.start[bobbing] + sine[ticks])
+
+    def velocity(self, sprite):
+        """
+        How far the rect of a patrol moved in the last step,
+        on the tick it turns back this is still the way it went before
+        """
+        i = getattr(sprite, "batch_index", None)
+        if i is None:
+            return 0, 0
+        move = int(self.last_move[i])
+        if self.kind[i] == PATROL_Y:
+            return 0, move
+        return move, 0
+
+    def sync(self, rects):
+        """
+        Returns (sprite, x, y, direction) of sprites which are
+        or were inside any of rects
+        """
+        n = self.count
+        if n == 0:
+            return []
+        rect_x = self.x[:n].astype(np.int64)
+        rect_y = self.y[:n].astype(np.int64)
+        synced = self.touched(rect_x, rect_y, rects)
+        sprites = self.sprites
+        return [(sprites[i], rx, ry, direction)
+                for i, rx, ry, direction in zip(synced.tolist(), rect_x[synced].tolist(),
+                                                rect_y[synced].tolist(), self.direction[synced].astype(int).tolist())]
@@ -0,0 +1,275 @@
+import hashlib
+import mmap
+import struct
+import sys
+import numpy as np
+
+# Level file starts with this header
+LEVEL_MAGIC = b"SKYW"
+LEVEL_VERSION = 2
+HEADER = struct.Struct("<4sHHIiIi")
+# Width of one column of the index (in pixels)
+COLUMN_WIDTH = 256
+LEVEL_FILE = "level1.lvl"
+
+# Types of records
+PLATFORM = 0
+MOVING_X = 1
+MOVING_Y = 2
+ENEMY = 3
+FLYER = 4
+COIN = 5
+GOAL = 6
+
+# Every object of the level is one record of the same size:
+# a and b are range and speed of platforms or distance and speed of enemies,
+# f is speed multiplier of flyers
+RECORD = np.dtype([
+    ("kind", "u1"), ("pad", "u1", 3),
+    ("x", "<i4"), ("y", "<i4"), ("w", "<i4"), ("h", "<i4"),
+    ("a", "<i4"), ("b", "<i4"), ("f", "<f8"),
+])
+
+
+def builtin_records():
+    """
+    Level which was written in the game code,
+    list of (kind, x, y, w, h, a, b, f)
+    """
+    records = []
+    # Creating map by using all platforms
+    level_layout = [
+        (0, 500, 800, 50),
+        (900, 400, 200, 30),
+        (1200, 300, 200, 30),
+        (1500, 200, 300, 30),
+        (2500, 250, 150, 30),
+        (2850, 200, 50, 20),
+        (3100, 150, 50, 20),
+        (2800, 400, 500, 50),
+        (3250, 100, 50, 300),
+        (3400, 400, 800, 30),
+        (4300, 300, 200, 30),
+        (4330, 500, 50, 30),
+        (4600, 500, 600, 50),
+        (5300, 450, 50, 15),
+        (5550, 350, 50, 15),
+        (5800, 250, 50, 15),
+        (6050, 150, 400, 30),
+        (6600, 350, 150, 30),
+        (6900, 500, 200, 50),
+        (7200, 400, 25, 10),
+        (7450, 300, 25, 10),
+        (7700, 200, 25, 10),
+        (7900, 300, 15, 5),
+        (8100, 350, 150, 30),
+        (8400, 500, 600, 50),
+        (9100, 400, 200, 30),
+        (9700, 200, 500, 50)
+    ]
+    for p in level_layout:
+        records.append((PLATFORM, p[0], p[1], p[2], p[3], 0, 0, 0.0))
+    # Horizontal and vertical moving platforms
+    records.append((MOVING_X, 1900, 350, 150, 30, 300, 2, 0.0))
+    records.append((MOVING_Y, 9400, 250, 150, 30, 150, 4, 0.0))
+    # Enemies and their location
+    enemies_data = [
+        (1550, 200, 200, 2),
+        (2850, 400, 300, 3),
+        (3500, 400, 600, 4),
+        (4650, 500, 500, 2),
+        (6100, 150, 300, 3),
+        (8500, 500, 400, 2),
+    ]
+    for e in enemies_data:
+        records.append((ENEMY, e[0], e[1], 0, 0, e[2], e[3], 0.0))
+    # Two different type of flies one slow and second one fast
+    records.append((FLYER, 5500, 200, 0, 0, 0, 0, 1.2))
+    records.append((FLYER, 9600, 100, 0, 0, 0, 0, 3.5))
+    # All coins / ammo
+    coins_data = [
+        (950, 350), (1650, 150), (3200, 350),
+        (3800, 350), (4350, 450), (5825, 200),
+        (6250, 100), (7215, 350), (9200, 350),
+    ]
+    for c in coins_data:
+        records.append((COIN, c[0], c[1], 0, 0, 0, 0, 0.0))
+    # Goal coordinate
+    records.append((GOAL, 10000, 200, 0, 0, 0, 0, 0.0))
+    return records
+
+
+def record_reach(records):
+    """
+    How far to the right of x every record can be,
+    with its size and whole way it moves
+    """
+    kind = records["kind"]
+    reach = records["w"].astype(np.int64)
+    moving = (kind == MOVING_X) | (kind == ENEMY)
+    reach[moving] += records["a"][moving] + records["b"][moving]
+    # Sizes of sprites without w in the record
+    reach[kind == ENEMY] += 50
+    reach[kind == FLYER] += 50
+    reach[kind == COIN] += 20
+    reach[kind == GOAL] += 50
+    return reach
+
+
+def build_level(records, column_width=COLUMN_WIDTH):
+    """
+    Sorting records by columns and building index,
+    returns header values, index, reach of columns and records
+    """
+    array = np.array([(r[0], (0, 0, 0)) + tuple(r[1:]) for r in records], dtype=RECORD)
+    columns = array["x"] // column_width
+    order = np.argsort(columns, kind="stable")
+    array = array[order]
+    columns = columns[order]
+    first = int(columns[0]) if len(array) else 0
+    count = int(columns[-1]) - first + 1 if len(array) else 0
+    # Records of column c are from index[c] to index[c + 1]
+    index = np.searchsorted(columns, np.arange(first, first + count + 1), side="left").astype("<u4")
+    # Rightmost x which records of every column can reach,
+    # empty columns reach only their own left side
+    reach = (np.arange(first, first + count) * column_width).astype("<i4")
+    starts = index[:-1]
+    full = starts < index[1:]
+    if len(array):
+        reach[full] = np.maximum.reduceat(array["x"] + record_reach(array), starts[full].astype(np.int64))
+    return (first, count), index, reach, array
+
+
+def write_level(path, records, column_width=COLUMN_WIDTH):
+    """
+    Saving records to the level file
+    """
+    (first, count), index, reach, array = build_level(records, column_width)
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(LEVEL_MAGIC, LEVEL_VERSION, RECORD.itemsize, len(array),
+                               column_width, count, first))
+        file.write(index.tobytes())
+        file.write(reach.tobytes())
+        file.write(array.tobytes())
+
+
+class Level:
+    """
+    Records of level with index of columns,
+    only records near the camera are turned into sprites
+    """
+    def __init__(self, records, index, reach, first_column, column_width):
+        """
+        Records, index and reach can be views of memory mapped file,
+        reach is the rightmost x which records of every column can reach
+        """
+        self.records = records
+        self.index = index
+        self.reach = reach
+        self.first_column = first_column
+        self.column_width = column_width
+        # Hash of the records, made when it is needed the first time
+        self.digest = None
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def length(self):
+        """
+        X of the rightmost record, the flag is usually there.
+        Records are sorted by columns, so only the last column is read
+        """
+        if not len(self.records):
+            return 0
+        return int(self.records[int(self.index[-2]):int(self.index[-1])]["x"].max())
+
+    @classmethod
+    def from_records(cls, records, column_width=COLUMN_WIDTH):
+        """
+        Level made in memory, e.g. from builtin_records
+        """
+        (first, count), index, reach, array = build_level(records, column_width)
+        return cls(array, index, reach, first, column_width)
+
+    @classmethod
+    def open(cls, path):
+        """
+        Memory mapping level file, records are read only when needed
+        """
+        with open(path, "rb") as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, length, column_width, count, first = HEADER.unpack_from(data)
+        if magic != LEVEL_MAGIC:
+            raise ValueError(f"{path} is not a level file")
+        if version != LEVEL_VERSION or record_size != RECORD.itemsize:
+            raise ValueError(f"{path} has level version {version}, expected {LEVEL_VERSION}")
+        index = np.frombuffer(data, dtype="<u4", count=count + 1, offset=HEADER.size)
+        reach = np.frombuffer(data, dtype="<i4", count=count, offset=HEADER.size + index.nbytes)
+        records = np.frombuffer(data, dtype=RECORD, count=length, offset=HEADER.size + index.nbytes + reach.nbytes)
+        return cls(records, index, reach, first, column_width)
+
+    @property
+    def key(self):
+        """
+        Hash of records and index, the same level always has the same key,
+        so snapshots can tell which level they were made in
+        """
+        if self.digest is None:
+            digest = hashlib.sha1()
+            digest.update(repr((self.first_column, self.column_width)).encode())
+            digest.update(self.index)
+            digest.update(self.reach)
+            digest.update(self.records)
+            self.digest = digest.hexdigest()
+        return self.digest
+
+    def column_of(self, x):
+        """
+        Column of the index which has point x
+        """
+        return int(x) // self.column_width
+
+    def column(self, column):
+        """
+        Records of one column as list of (number, record),
+        number is the place of the record in the level
+        """
+        i = column - self.first_column
+        if not 0 <= i < len(self.index) - 1:
+            return []
+        first = int(self.index[i])
+        rows = self.records[first:int(self.index[i + 1])]
+        return [(first + n, (r[0],) + r[2:]) for n, r in enumerate(rows.tolist())]
+
+    def record(self, number):
+        """
+        One record as (kind, x, y, w, h, a, b, f)
+        """
+        r = self.records[number].tolist()
+        return (r[0],) + r[2:]
+
+    def region_columns(self, left, right):
+        """
+        Columns which must be loaded to have every record which can be
+        between left and right, from left to right. Columns before left
+        are there only when some of their records reach it
+        """
+        start = self.column_of(left)
+        end = self.column_of(right) + 1
+        before = min(start - self.first_column, len(self.reach))
+        if before <= 0:
+            return list(range(start, end))
+        reaching = np.flatnonzero(self.reach[:before] >= left) + self.first_column
+        return reaching.tolist() + list(range(start, end))
+
+
+def convert(path=LEVEL_FILE):
+    """
+    Turning level from the game code into level file
+    """
+    write_level(path, builtin_records())
+
+
+if __name__ == "__main__":
+    convert(sys.argv[1] if len(sys.argv) > 1 else LEVEL_FILE)
@@ -1,20 +1,30 @@
-import pygame
-import math
+import sys
 import random
+import time
+import pygame
+from world import World, Inputs, SCREEN_WIDTH, SCREEN_HEIGHT, TICKS_PER_SECOND, convert_images
+from assets import BackgroundLoader
+from camera import camera_rect
+from text import TextCache
+from present import Presenter
+from view import GameView, UI_FONT, AMMO_FONT
+from profiler import FrameProfiler, ProfilerOverlay, FRAME_BUDGET
+from replay import InputRecorder
+from governor import QualityGovernor
+
+
+def option(name):
+    """
+    Value after name in the command line, None when it is not there
+    """
+    if name in sys.argv[1:-1]:
+        return sys.argv[sys.argv.index(name) + 1]
+    return None
+
 
 # Game setup
 pygame.init()
 pygame.mixer.init()
-SCREEN_WIDTH = 800
-SCREEN_HEIGHT = 600
-PLAYER_SPEED = 7
-PLAYER_JUMP = -17
-PLAYER_GRAVITY = 0.8
-SHOOT_DELAY = 400
-GRAVITY_PARTICLE = 0.2
-BULLET_SPEED = 12
-PLATFORM_SPEED_X = 2
-PLATFORM_SPEED_Y = 4
 COLOR_VICTORY = (50, 200, 50)
 COLOR_GAME_OVER = (50, 0, 0)
 VOL_SHOOT = 0.4
@@ -22,18 +32,53 @@ VOL_JUMP = 0.5
 VOL_HIT = 0.6
 VOL_COIN = 0.6
 VOL_MUSIC = 0.2
-MAP_LENGTH = 10000
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+# Sending only changed parts of the screen, for slow machines and remote sessions
+DIRTY_RECTS = "--dirty-rects" in sys.argv
+# F3 shows frame profiler, --profile FILE saves every frame to .csv or .jsonl file
+PROFILE_FILE = option("--profile")
+# --record FILE saves buttons of every tick, replay.py plays them again,
+# random numbers of the world come from the seed, so the replay is the same
+RECORD_FILE = option("--record")
+SEED = int(option("--seed")) if option("--seed") else None
+if RECORD_FILE and SEED is None:
+    SEED = random.randrange(2 ** 32)
+# --checkpoints DISTANCE starts the hero again from the last checkpoint instead of the start,
+# F5 saves the game and F9 loads it, replays can not repeat them, so they are off while recording
+CHECKPOINT_DISTANCE = int(option("--checkpoints")) if option("--checkpoints") and not RECORD_FILE else None
+QUICK_SAVE = not RECORD_FILE
+# World always runs TICKS_PER_SECOND ticks, frames are drawn as often as --fps allows,
+# with --vsync as often as the display shows them
+VSYNC = "--vsync" in sys.argv
+RENDER_FPS = int(option("--fps")) if option("--fps") else (0 if VSYNC else 60)
+# Time is counted in thousandths of a tick (milliseconds * ticks per second),
+# so it adds up without rounding errors
+TICK_UNITS = 1000
+# Slow frame runs at most this many ticks, the rest of the time is dropped
+MAX_SUBSTEPS = 5
+# Effects are reduced when frames do not fit into the time of one frame, --no-governor keeps them all.
+# Particles are part of the replay, so it is off while recording
+GOVERNOR = "--no-governor" not in sys.argv and not RECORD_FILE
+try:
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SCALED if VSYNC else 0, vsync=VSYNC)
+except pygame.error:
+    # Vsync is not supported everywhere
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 pygame.display.set_caption("Sky wars version 1.67")
 clock = pygame.time.Clock()
+presenter = Presenter(DIRTY_RECTS)
 running = True
 
 
 # All fonts and their sizes
 title_font = pygame.font.SysFont("freesansbold.ttf", 80)
 menu_font = pygame.font.SysFont("freesansbold.ttf", 40)
-ui_font = pygame.font.SysFont("freesansbold.ttf", 24)
-ammo_font = pygame.font.SysFont("freesansbold.ttf", 30)
+ui_font = pygame.font.SysFont(*UI_FONT)
+ammo_font = pygame.font.SysFont(*AMMO_FONT)
+# Rendered texts are remembered
+text_cache = TextCache()
+# Profiler is off until F3 is pressed or file is given
+frame_profiler = FrameProfiler(path=PROFILE_FILE)
+profiler_overlay = ProfilerOverlay(ui_font)
 
 
 def load_sound(name):
@@ -49,14 +94,20 @@ def load_sound(name):
 shoot_sound = load_sound("shoot.wav")
 jump_sound = load_sound("jump.wav")
 hit_sound = load_sound("hit.wav")
-win_sound = load_sound("win.mp3")
-lose_sound = load_sound("lose.mp3")
 coin_sound = load_sound("coin.wav")
 # Volume
 shoot_sound.set_volume(VOL_SHOOT)
 jump_sound.set_volume(VOL_JUMP)
 hit_sound.set_volume(VOL_HIT)
 coin_sound.set_volume(VOL_COIN)
+# Win and lose sounds are not needed at start, they are loaded in the background
+loader = BackgroundLoader({
+    "win": lambda: load_sound("win.mp3"),
+    "lose": lambda: load_sound("lose.mp3"),
+}).start()
+win_sound = None
+lose_sound = None
+loading = True
 
 # Music in game
 pygame.mixer.music.load("music.mp3")
@@ -64,656 +115,275 @@ pygame.mixer.music.set_volume(VOL_MUSIC)
 pygame.mixer.music.play(-1)
 
 
-def load_image(name, scale_size=None):
-    """
-    Function to load all images
-    and its size
-    """
-    image = pygame.image.load(name)
-    image = image.convert_alpha()
-    if scale_size:
-        image = pygame.transform.scale(image, scale_size)
-    return image
-
-
-# Background image, flipped to make smooth transition
-bg_img = load_image("background.png", (SCREEN_WIDTH, SCREEN_HEIGHT))
-bg_img_flipped = pygame.transform.flip(bg_img, True, False)
-bg_width = bg_img.get_width()
-# All images for bullet, oponnents and hero
-player_img = load_image("hero.png", (50, 60))
-enemy_img = load_image("enemy.png", (50, 40))
-fly_img = load_image("enemy2.png", (50, 40))
-flag_img = load_image("flag.png", (50, 60))
-platform_texture = load_image("pixel.png")
-bullet_img = load_image("bullet.png", (60, 30))
-coin_img = load_image("coin.png", (40, 40))
-
-# Classes
-
-
-class Particle(pygame.sprite.Sprite):
-    """
-    Class to make effect when collecting coins
-    or killing enemies
-    """
-    def __init__(self, x, y, color):
-        """
-        Random size of every particle
-        and random velocity
-        """
-        super().__init__()
-        size = random.randint(3, 6)
-        self.image = pygame.Surface((size, size))
-        self.image.fill(color)
-        self.rect = self.image.get_rect(center=(x, y))
-
-        self.vx = random.uniform(-5, 5)
-        self.vy = random.uniform(-5, 5)
-        self.gravity = GRAVITY_PARTICLE  # To make particles fall down
-        self.life = random.randint(20, 40)  # Random time for every particle
-
-    def update(self):
-        """
-        This function controls how particles move
-        """
-        self.vx *= 0.95
-        self.vy += self.gravity
-        self.rect.x += self.vx
-        self.rect.y += self.vy
-        self.life -= 1
-        if self.life <= 0:
-            self.kill()
-
-
-class Platform(pygame.sprite.Sprite):
-    """
-    Represents a static map element
-    """
-    def __init__(self, x, y, width, height):
-        """
-        Creating platform
-        """
-        super().__init__()
-        self.image = pygame.transform.scale(platform_texture, (width, height))
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y
-
-
-class MovingPlatform_x(Platform):
-    """
-    Platoform moving horizontally
-    """
-    def __init__(self, x, y, width, height, range_dist=100, speed=PLATFORM_SPEED_X):
-        """
-        Function which define platform move
-        """
-        super().__init__(x, y, width, height)
-        self.start_x = x
-        self.range_dist = range_dist
-        self.move_speed = speed
-        self.direction = 1
-
-    def update(self):
-        """
-        Handles platform movement and directional switching.
-        """
-        self.rect.x += self.move_speed * self.direction
-        if self.rect.x > self.start_x + self.range_dist:
-            self.direction = -1
-        elif self.rect.x < self.start_x:
-            self.direction = 1
-
-
-class MovingPlatform_y(Platform):
-    """
-    Platoform moving vertically
-    """
-    def __init__(self, x, y, width, height, range_dist=100, speed=PLATFORM_SPEED_Y):
-        """
-        Function which define platform move
-        """
-        super().__init__(x, y, width, height)
-        self.start_y = y
-        self.range_dist = range_dist
-        self.move_speed = speed
-        self.direction = 1
-
-    def update(self):
-        """
-        Handles platform movement and directional switching.
-        """
-        self.rect.y += self.move_speed * self.direction
-        if self.rect.y > self.start_y + self.range_dist:
-            self.direction = -1
-        elif self.rect.y < self.start_y:
-            self.direction = 1
-
-
-class Coin(pygame.sprite.Sprite):
-    """
-    Class which defines coin as a objects possible to collect
-    """
-    def __init__(self, x, y):
-        """
-        Coin creating
-        """
-        super().__init__()
-        self.image = coin_img
-        self.rect = self.image.get_rect()
-        self.rect.center = (x, y)
-        self.start_y = y
-        self.timer = 0
-
-    def update(self):
-        """
-        Animation for coin
-        """
-        self.timer += 0.1
-        self.rect.y = self.start_y + math.sin(self.timer) * 5
-
-
-class Bullet(pygame.sprite.Sprite):
-    """
-    Class for bullets which our hero is using to kill enemies
-    """
-    def __init__(self, x, y, direction):
-        """
-        Creating bullet
-        """
-        super().__init__()
-        self.image = bullet_img
-        self.rect = self.image.get_rect()
-        self.rect.center = (x, y)
-        self.speed = BULLET_SPEED * direction
-        if direction == -1:  # Flip bullet sprite if the player is facing left.
-            self.image = pygame.transform.flip(bullet_img, True, False)
-
-    def update(self):
-        """
-        Removing bullets when they are too far behind the map
-        """
-        self.rect.x += self.speed
-        if self.rect.x < -100 or self.rect.x > MAP_LENGTH + 1000:
-            self.kill()
-
-
-class Player(pygame.sprite.Sprite):
-    """
-    Class for our hero
-    """
-    def __init__(self, platforms_group, bullets_group):
-        """
-        Hero creating
-        """
-        super().__init__()
-        self.image_right = player_img
-        self.image_left = pygame.transform.flip(player_img, True, False)
-        self.image = self.image_right
-        self.rect = self.image.get_rect()
-        self.rect.inflate_ip(-15, 0)
-        self.platforms = platforms_group
-        self.bullets = bullets_group
-
-        # Setup of hero
-        self.start_pos = (100, 400)
-        self.rect.x = self.start_pos[0]
-        self.rect.y = self.start_pos[1]
-        self.speed = PLAYER_SPEED
-        self.on_ground = False
-        self.velocity_y = 0
-        self.facing_right = True
-
-        self.last_shot_time = pygame.time.get_ticks()
-        self.ammo = 1
-
-    def shoot(self):
-        """
-        Function for shooting
-        """
-        now = pygame.time.get_ticks()
-        if now - self.last_shot_time > SHOOT_DELAY:  # Delay for shooting
-            if self.ammo > 0:
-                self.last_shot_time = now
-                self.ammo -= 1
-                if self.facing_right:
-                    direction = 1
-                else:
-                    direction = -1
-                bullet = Bullet(self.rect.centerx, self.rect.centery, direction)
-                all_sprites.add(bullet)
-                self.bullets.add(bullet)
-                shoot_sound.play()
-
-    def update(self):
-        """
-        Controls for main character
-        """
-        keys = pygame.key.get_pressed()
-        dx = 0
-        if keys[pygame.K_LEFT]:
-            dx = -self.speed
-            self.image = self.image_left
-            self.facing_right = False
-        if keys[pygame.K_RIGHT]:
-            dx = self.speed
-            self.image = self.image_right
-            self.facing_right = True
-        if keys[pygame.K_SPACE]:
-            self.shoot()
-        if keys[pygame.K_UP] and self.on_ground:
-            self.velocity_y = PLAYER_JUMP
-            self.on_ground = False
+# Images can be converted now, when the window exists
+convert_images()
+# Background, platforms, actors and information of the game
+view = GameView(screen, presenter, text_cache, ui_font, ammo_font)
+
+# Whole game is inside the world, this file only shows it
+world = World(seed=SEED, checkpoint_distance=CHECKPOINT_DISTANCE)
+recorder = InputRecorder(SEED) if RECORD_FILE else None
+# Snapshot of the world saved by F5
+quick_save = None
+governor = QualityGovernor(1000 / RENDER_FPS if RENDER_FPS else FRAME_BUDGET) if GOVERNOR else None
+if frame_profiler.enabled:
+    world.profiler = frame_profiler
+
+
+def read_inputs():
+    """
+    Buttons pressed by player in this frame
+    """
+    keys = pygame.key.get_pressed()
+    return Inputs(keys[pygame.K_LEFT], keys[pygame.K_RIGHT], keys[pygame.K_UP], keys[pygame.K_SPACE])
+
+
+def play_sounds(events):
+    """
+    Playing sounds for everything what happened in the world
+    """
+    for event in events:
+        if event == "start":
+            if not pygame.mixer.music.get_busy():
+                pygame.mixer.music.play(-1)
+        elif event == "shoot":
+            shoot_sound.play()
+        elif event == "jump":
             jump_sound.play()
+        elif event == "hit":
+            hit_sound.play()
+        elif event == "coin":
+            coin_sound.play()
+        elif event == "win":
+            pygame.mixer.music.stop()
+            win_sound.play()
+        elif event == "lose":
+            pygame.mixer.music.stop()
+            lose_sound.play()
 
-        # Rules for horizontal movement
-        self.rect.x += dx
-        hits = pygame.sprite.spritecollide(self, self.platforms, False)
-        for platform in hits:
-            if self.rect.bottom <= platform.rect.top + 15:
-                continue
-
-            if dx > 0:
-                self.rect.right = platform.rect.left
-            if dx < 0:
-                self.rect.left = platform.rect.right
-
-        # Rules for vertical movement
-        self.velocity_y += PLAYER_GRAVITY
-        self.rect.y += self.velocity_y
-        self.on_ground = False
-
-        hits = pygame.sprite.spritecollide(self, self.platforms, False)
-
-        if not hits and self.velocity_y >= 0:
-            check_rect = self.rect.move(0, 15)
-            for platform in self.platforms:
-                if check_rect.colliderect(platform.rect):
-                    hits = [platform]
-                    break
-        # Settings for moving platforms
-        for platform in hits:
-            if self.velocity_y > 0:
-                self.rect.bottom = platform.rect.top
-                self.velocity_y = 0
-                self.on_ground = True
-                if isinstance(platform, MovingPlatform_x):
-                    self.rect.x += platform.move_speed * platform.direction
-            elif self.velocity_y < 0:
-                self.rect.top = platform.rect.bottom
-                self.velocity_y = 0
-        # Invisible barriers
-        if self.rect.x < 0:
-            self.rect.x = 0
-        if self.rect.x > MAP_LENGTH + 200:
-            self.rect.x = MAP_LENGTH + 200
-
-
-class Enemy(pygame.sprite.Sprite):
-    """
-    Class for basic opponents
-    """
-    def __init__(self, x, y, distance, speed=2):
-        """
-        Creating basic opponents
-        """
-        super().__init__()
-        self.image = enemy_img
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.bottom = y
-        self.start_x = x
-        self.max_dist = distance
-        self.direction = 1
-        self.speed = speed
-
-    def update(self):
-        """
-        Updating their movements
-        """
-        self.rect.x += self.speed * self.direction
-        if self.rect.x > self.start_x + self.max_dist:
-            self.direction = -1
-            self.image = pygame.transform.flip(enemy_img, True, False)
-        elif self.rect.x < self.start_x:
-            self.direction = 1
-            self.image = enemy_img
-
-
-class FlyEnemy(pygame.sprite.Sprite):
-    """
-    Class for fly enemy
-    """
-    def __init__(self, x, y, target_player, speed_multiplier=1.0):
-        """
-        Creating fly enemy and its movement
-        """
-        super().__init__()
-        self.image = fly_img
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y
-        self.player = target_player
-        self.base_speed = 1.5 * speed_multiplier
-        self.true_x = float(x)
-        self.true_y = float(y)
-
-    def update(self):
-        """
-        Defining what is goal of these flies
-        """
-        dx = self.player.rect.centerx - self.rect.centerx
-        dy = self.player.rect.centery - self.rect.centery
-        distance = math.sqrt(dx**2 + dy**2)
-        # Showing when flies starting to move
-        if distance < 1000 and distance != 0:
-            dx = dx / distance
-            dy = dy / distance
-            self.true_x += dx * self.base_speed
-            self.true_y += dy * self.base_speed
-
-        self.rect.x = int(self.true_x)
-        self.rect.y = int(self.true_y)
-        # Flipping fly if needed
-        if dx > 0:
-            self.image = pygame.transform.flip(fly_img, True, False)
-        else:
-            self.image = fly_img
-
-
-class Flag(pygame.sprite.Sprite):
-    """
-    Class for flag - our main goal
-    """
-    def __init__(self, x, y):
-        """
-        Creating flag
-        """
-        super().__init__()
-        self.image = flag_img
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.bottom = y
-
-
-# All actors and objects
-all_sprites = pygame.sprite.Group()
-platforms = pygame.sprite.Group()
-enemies = pygame.sprite.Group()
-goals = pygame.sprite.Group()
-bullets = pygame.sprite.Group()
-coins = pygame.sprite.Group()
-particles = pygame.sprite.Group()
-
-player = None
-scroll_x = 0
-game_state = "MENU"
-
-
-def create_particles(x, y, color, amount=10):
-    """
-    Creating explosions
-    """
-    for _ in range(amount):
-        p = Particle(x, y, color)
-        all_sprites.add(p)
-        particles.add(p)
-
-
-def init_level():
-    """
-    Creating level
-    """
-    global player, scroll_x, game_state
-
-    if not pygame.mixer.music.get_busy():
-        pygame.mixer.music.play(-1)
-
-    all_sprites.empty()
-    platforms.empty()
-    enemies.empty()
-    goals.empty()
-    bullets.empty()
-    coins.empty()
-    particles.empty()
-
-    scroll_x = 0
-    # Setting current game state
-    game_state = "GAME"
-    # Creating map by using all platforms
-    level_layout = [
-        (0, 500, 800, 50),
-        (900, 400, 200, 30),
-        (1200, 300, 200, 30),
-        (1500, 200, 300, 30),
-        (2500, 250, 150, 30),
-        (2850, 200, 50, 20),
-        (3100, 150, 50, 20),
-        (2800, 400, 500, 50),
-        (3250, 100, 50, 300),
-        (3400, 400, 800, 30),
-        (4300, 300, 200, 30),
-        (4330, 500, 50, 30),
-        (4600, 500, 600, 50),
-        (5300, 450, 50, 15),
-        (5550, 350, 50, 15),
-        (5800, 250, 50, 15),
-        (6050, 150, 400, 30),
-        (6600, 350, 150, 30),
-        (6900, 500, 200, 50),
-        (7200, 400, 25, 10),
-        (7450, 300, 25, 10),
-        (7700, 200, 25, 10),
-        (7900, 300, 15, 5),
-        (8100, 350, 150, 30),
-        (8400, 500, 600, 50),
-        (9100, 400, 200, 30),
-        (9700, 200, 500, 50)
-    ]
-    # Adding platform to the map
-    for p in level_layout:
-        plat = Platform(p[0], p[1], p[2], p[3])
-        platforms.add(plat)
-        all_sprites.add(plat)
-    # Creating horizontal platform
-    moving_plat_x = MovingPlatform_x(1900, 350, 150, 30, range_dist=300, speed=2)
-    platforms.add(moving_plat_x)
-    all_sprites.add(moving_plat_x)
-    # Creating horizontal platform
-    moving_plat_y = MovingPlatform_y(9400, 250, 150, 30, range_dist=150, speed=4)
-    platforms.add(moving_plat_y)
-    all_sprites.add(moving_plat_y)
-
-    player = Player(platforms, bullets)
-    all_sprites.add(player)
-    # Creating enemies and their location
-    enemies_data = [
-        (1550, 200, 200, 2),
-        (2850, 400, 300, 3),
-        (3500, 400, 600, 4),
-        (4650, 500, 500, 2),
-        (6100, 150, 300, 3),
-        (8500, 500, 400, 2),
-    ]
-    # Adding enemies to the level
-    for e_data in enemies_data:
-        e = Enemy(e_data[0], e_data[1], e_data[2], e_data[3])
-        enemies.add(e)
-        all_sprites.add(e)
-    # Two different type of flies one slow and second one fast
-    slow_fly = FlyEnemy(5500, 200, player, speed_multiplier=1.2)
-    enemies.add(slow_fly)
-    all_sprites.add(slow_fly)
-
-    boss_fly = FlyEnemy(9600, 100, player, speed_multiplier=3.5)
-    enemies.add(boss_fly)
-    all_sprites.add(boss_fly)
-    # All coins / ammo
-    coins_data = [
-        (950, 350), (1650, 150), (3200, 350),
-        (3800, 350), (4350, 450), (5825, 200),
-        (6250, 100), (7215, 350), (9200, 350),
-    ]
-    # Adding coins to the map
-    for c_pos in coins_data:
-        c = Coin(c_pos[0], c_pos[1])
-        coins.add(c)
-        all_sprites.add(c)
-    # Goal coordinate
-    win_flag = Flag(10000, 200)
-    goals.add(win_flag)
-    all_sprites.add(win_flag)
+
+def apply_quality():
+    """
+    Setting effects to the level chosen by the governor
+    """
+    quality = governor.quality
+    world.particles.amount_scale = quality.particles
+    world.particles.life_scale = quality.life
+    presenter.invalidate()
+
+
+def quick_save_or_load(key):
+    """
+    F5 remembers the world during the game, F9 puts it back at any time
+    """
+    global quick_save
+    if key == pygame.K_F5:
+        if world.game_state == "GAME":
+            quick_save = world.snapshot()
+    elif quick_save is not None:
+        world.restore(quick_save)
+        play_sounds(["start"])
+        presenter.invalidate()
 
 
 def draw_centered_text(text, font, color, y_offset=0):
     """
     Function to simplify creating text
     """
-    surface = font.render(text, True, color)
+    surface = text_cache.render(font, text, color)
     rect = surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + y_offset))
     return surface, rect
 
 
-def draw_menu():
+def draw_menu(surface):
     """
     Function with main menu
     """
-    screen.fill("skyblue")
+    surface.fill("skyblue")
     title_text, title_rect = draw_centered_text("Sky wars", title_font, "white", -150)
     shadow_text, shadow_rect = draw_centered_text("Sky wars", title_font, "black", -145)  # Shadow effect
-    screen.blit(shadow_text, shadow_rect)
-    screen.blit(title_text, title_rect)
+    surface.blit(shadow_text, shadow_rect)
+    surface.blit(title_text, title_rect)
     start_text, start_rect = draw_centered_text("Press SPACE to Start", menu_font, "black", 0)
-    screen.blit(start_text, start_rect)
+    surface.blit(start_text, start_rect)
     set_text, set_rect = draw_centered_text("Settings:", menu_font, "black", 50)
-    screen.blit(set_text, set_rect)
+    surface.blit(set_text, set_rect)
     set1_text, set1_rect = draw_centered_text("Arrows: Move", ui_font, "black", 90)
-    screen.blit(set1_text, set1_rect)
+    surface.blit(set1_text, set1_rect)
     set2_text, set2_rect = draw_centered_text("Space: Shoot", ui_font, "black", 130)
-    screen.blit(set2_text, set2_rect)
+    surface.blit(set2_text, set2_rect)
     info_text, info_rect = draw_centered_text("Collect coins for ammo!", ui_font, "red", 200)
-    screen.blit(info_text, info_rect)
+    surface.blit(info_text, info_rect)
+
+
+def draw_loading_screen(surface):
+    """
+    Screen shown until all assets are loaded
+    """
+    surface.fill("skyblue")
+    t, r = draw_centered_text("Loading...", menu_font, "black", 0)
+    surface.blit(t, r)
 
 
-def draw_ui_game():
+def finish_loading():
     """
-    Information in game about ammo and settings
+    Taking assets from the background loader
     """
-    ammo_text = ammo_font.render(f"AMMO: {player.ammo}", True, "black")
-    screen.blit(ammo_text, (20, 20))
-    help_text = ui_font.render("Arrows: Move | Space: Shoot", True, (50, 50, 50))
-    screen.blit(help_text, (20, 55))
+    global win_sound, lose_sound, loading
+    win_sound = loader.get("win")
+    lose_sound = loader.get("lose")
+    loading = False
 
 
-def draw_win_screen():
+def draw_win_screen(surface):
     """
     Win screen
     """
-    screen.fill(COLOR_VICTORY)
+    surface.fill(COLOR_VICTORY)
     t, r = draw_centered_text("VICTORY!", title_font, "gold", -50)
     s, sr = draw_centered_text("Press SPACE to Play Again", menu_font, "white", 50)
-    screen.blit(t, r)
-    screen.blit(s, sr)
+    surface.blit(t, r)
+    surface.blit(s, sr)
 
 
-def draw_lose_screen():
+def draw_lose_screen(surface):
     """
     Lose screen
     """
-    screen.fill(COLOR_GAME_OVER)
+    surface.fill(COLOR_GAME_OVER)
     t, r = draw_centered_text("GAME OVER", title_font, "red", -50)
     s, sr = draw_centered_text("Press SPACE to Restart", menu_font, "white", 50)
-    screen.blit(t, r)
-    screen.blit(s, sr)
+    surface.blit(t, r)
+    surface.blit(s, sr)
+
+
+# Screens which do not change, they are drawn once for every state
+static_screens = {
+    "LOADING": draw_loading_screen,
+    "MENU": draw_menu,
+    "WIN": draw_win_screen,
+    "LOSE": draw_lose_screen,
+}
+static_screen = None
+static_state = None
+
+
+def draw_static_screen(state):
+    """
+    Composing whole screen once and reusing it until the state changes
+    """
+    global static_screen, static_state
+    if state != static_state:
+        static_screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        static_screens[state](static_screen)
+        static_state = state
+    screen.blit(static_screen, (0, 0))
+
+
+def draw_profiler():
+    """
+    Frame times over the game, only when F3 was pressed
+    """
+    rect = profiler_overlay.draw(screen, frame_profiler, (SCREEN_WIDTH - 10, 10))
+    if presenter.dirty:
+        presenter.area("profiler", rect)
+    frame_profiler.mark("overlay")
+
+
+def count_sprites(profiler):
+    """
+    Sizes of groups for the profiler
+    """
+    profiler.count("all_sprites", len(world.all_sprites))
+    profiler.count("awake", world.all_sprites.awake)
+    profiler.count("platforms", len(world.platforms))
+    profiler.count("enemies", len(world.enemies))
+    profiler.count("coins", len(world.coins))
+    profiler.count("bullets", len(world.bullets))
+    profiler.count("live_particles", len(world.particles))
 
 
 def main():
     """
     Main loop
     """
-    global running, scroll_x, game_state
+    global running
+    # Time which was not simulated yet, the first frame runs one tick at once
+    accumulator = TICK_UNITS
+    places = None
     while running:
+        started = time.perf_counter()
+        # None while profiler is disabled, then it costs nothing
+        profiler = world.profiler
+        if profiler:
+            profiler.begin_frame()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
-
-        if game_state == "MENU":
-            draw_menu()
-            keys = pygame.key.get_pressed()  # Start option
-            if keys[pygame.K_SPACE]:
-                init_level()
-
-        elif game_state == "GAME":
-            all_sprites.update()
-            # Following camera
-            target_scroll = player.rect.x - 300
-            scroll_x += (target_scroll - scroll_x) * 0.1
-            if scroll_x < 0:
-                scroll_x = 0
-            if scroll_x > MAP_LENGTH - 400:
-                scroll_x = MAP_LENGTH - 400
-
-            # Bullets and effects
-            hits = pygame.sprite.groupcollide(bullets, enemies, True, False)
-            for bullet, hit_enemies in hits.items():
-                for enemy in hit_enemies:
-                    if -100 < enemy.rect.x - scroll_x < SCREEN_WIDTH + 100:
-                        # Killing effect
-                        create_particles(enemy.rect.centerx, enemy.rect.centery, "green", 15)
-                        enemy.kill()
-                        hit_sound.play()
-
-            # Collecting coins
-            collected_coins = pygame.sprite.spritecollide(player, coins, True)
-            for coin in collected_coins:
-                # Collecting effect
-                create_particles(coin.rect.centerx, coin.rect.centery, "gold", 10)
-                player.ammo += 1
-                coin_sound.play()
-
-            if pygame.sprite.spritecollide(player, enemies, False):
-                pygame.mixer.music.stop()
-                lose_sound.play()
-                game_state = "LOSE"
-
-            if player.rect.y > SCREEN_HEIGHT:
-                pygame.mixer.music.stop()
-                lose_sound.play()
-                game_state = "LOSE"
-
-            if pygame.sprite.spritecollide(player, goals, False):
-                pygame.mixer.music.stop()
-                win_sound.play()
-                game_state = "WIN"
-
-            screen.fill("skyblue")
-            start_tile = int(scroll_x) // bg_width
-            for i in range(start_tile - 1, start_tile + 3):
-                pos_x = i * bg_width - int(scroll_x)
-                screen.blit(bg_img if i % 2 == 0 else bg_img_flipped, (pos_x, 0))
-
-            # Creating all actors
-            for sprite in all_sprites:
-                screen.blit(sprite.image, (sprite.rect.x - int(scroll_x), sprite.rect.y))
-
-            draw_ui_game()
-
-        elif game_state == "WIN":
-            draw_win_screen()
-            keys = pygame.key.get_pressed()
-            if keys[pygame.K_SPACE]:
-                init_level()
-
-        elif game_state == "LOSE":
-            draw_lose_screen()
-            keys = pygame.key.get_pressed()
-            if keys[pygame.K_SPACE]:
-                init_level()
-
-        pygame.display.flip()
-        clock.tick(60)
-
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                presenter.invalidate()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                frame_profiler.toggle_overlay()
+            elif event.type == pygame.KEYDOWN and event.key in (pygame.K_F5, pygame.K_F9):
+                if QUICK_SAVE and not loading:
+                    quick_save_or_load(event.key)
+        if profiler:
+            profiler.mark("events")
+
+        if loading and loader.ready():
+            finish_loading()
+
+        if loading:
+            # Game waits until the rest of assets is loaded
+            state = "LOADING"
+            accumulator = TICK_UNITS
+        else:
+            # Screen shows the state from the beginning of the frame
+            state = world.game_state
+            inputs = read_inputs()
+            # Every tick which fits into the time is run, but at most MAX_SUBSTEPS,
+            # so a slow frame does not make the next one even slower
+            substeps = min(accumulator // TICK_UNITS, MAX_SUBSTEPS)
+            accumulator = min(accumulator - substeps * TICK_UNITS, TICK_UNITS - 1)
+            for substep in range(substeps):
+                if substep == substeps - 1:
+                    places = view.remember_places(world)
+                if recorder:
+                    recorder.record(inputs)
+                events = world.step(inputs)
+                play_sounds(events)
+            if governor and not governor.quality.offscreen:
+                world.particles.cull(camera_rect(world.scroll_x, SCREEN_WIDTH, SCREEN_HEIGHT, 0))
+            if profiler:
+                profiler.mark("sounds")
+                profiler.count("substeps", substeps)
+                profiler.count("quality", governor.level if governor else 0)
+
+        if state == "GAME":
+            layers = governor.quality.layers if governor else None
+            scroll_x = view.draw(world, places, accumulator / TICK_UNITS, layers)
+            if profiler and frame_profiler.overlay:
+                draw_profiler()
+            presenter.present_game(scroll_x)
+        elif not presenter.static_ready(state):
+            draw_static_screen(state)
+            presenter.present_static(state)
+        if profiler:
+            profiler.mark("present")
+            count_sprites(profiler)
+        # Only frames of the game tell how fast effects can be drawn
+        if governor and state == "GAME" and governor.add_frame((time.perf_counter() - started) * 1000):
+            apply_quality()
+
+        accumulator += clock.tick(RENDER_FPS) * TICKS_PER_SECOND
+        if profiler:
+            profiler.mark("wait")
+            profiler.end_frame()
+        world.profiler = frame_profiler if frame_profiler.enabled else None
+
+    frame_profiler.close()
+    if recorder:
+        recorder.save(RECORD_FILE, world)
     pygame.quit()
 
 
@@ -0,0 +1,89 @@
+import gc
+import tracemalloc
+from collections import Counter
+import numpy as np
+from images import image_bytes
+from world import World, images
+
+# Sprites of every type made to measure one of them
+MEMORY_SAMPLES = 200
+
+
+def traced_bytes(make):
+    """
+    Memory allocated by make() which is still used after it, and its result.
+    Tracemalloc runs only while measuring, unless it was started before
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    result = make()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    if started:
+        tracemalloc.stop()
+    return size, result
+
+
+def array_bytes(*arrays):
+    return sum(array.nbytes for array in arrays)
+
+
+def sprite_costs(level, samples=MEMORY_SAMPLES):
+    """
+    Bytes of one sprite of every type and of its place in groups and batches,
+    measured on sprites made from records of level in an empty world.
+    Images shared by many sprites are made before, they are not counted
+    """
+    world = World(level=level)
+    kinds = level.records["kind"]
+    costs = {}
+    for kind in np.unique(kinds).tolist():
+        numbers = np.flatnonzero(kinds == kind)
+        numbers = numbers[::max(len(numbers) // samples, 1)][:samples].tolist()
+        records = [level.record(number) for number in numbers]
+        for record in records:
+            world.make_sprite(record).kill()
+        sprite_size, sprites = traced_bytes(lambda: [world.make_sprite(record) for record in records])
+        # Dicts of groups grow by doubling, many sprites give the average
+        group_size, _ = traced_bytes(lambda: [world.add_sprite(sprite, record[0])
+                                              for sprite, record in zip(sprites, records)])
+        costs[type(sprites[0]).__name__] = {
+            "sprite_bytes": round(sprite_size / len(sprites)),
+            "group_bytes": round(group_size / len(sprites)),
+        }
+    return costs
+
+
+def memory_report(world, samples=MEMORY_SAMPLES):
+    """
+    Memory used by the world: sprites of every type which exist now with their
+    places in groups, arrays of records, batches and particles, and pixels of images.
+    Pixels are not seen by tracemalloc, they are counted from sizes of images
+    """
+    costs = sprite_costs(world.level, samples)
+    counts = Counter(type(sprite).__name__ for sprite in world.sprites.values() if sprite.alive())
+    types = {}
+    for name, cost in costs.items():
+        count = counts.get(name, 0)
+        types[name] = dict(cost, count=count, total_bytes=count * (cost["sprite_bytes"] + cost["group_bytes"]))
+    level = world.level
+    particles = world.particles
+    batches = {"kinematics": world.kinematics, "swarm": world.swarm}
+    return {
+        "types": types,
+        "sprites_bytes": sum(entry["total_bytes"] for entry in types.values()),
+        "records": {"count": len(level), "bytes": array_bytes(level.records, level.index)},
+        "batches": {name: array_bytes(*(getattr(batch, field) for field in batch.fields))
+                    for name, batch in batches.items()},
+        "particles": array_bytes(particles.x, particles.y, particles.vx, particles.vy,
+                                 particles.life, particles.kind, particles.scratch),
+        "images": {
+            "fixed_bytes": sum(image_bytes(image) for image in images.fixed.values()),
+            "cached_bytes": images.used_bytes,
+            "cached": len(images.variants),
+        },
+        "traced_bytes": tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None,
+    }
@@ -0,0 +1,194 @@
+import random
+import numpy as np
+import pygame
+
+# How many particles can live at the same time
+PARTICLE_CAPACITY = 65536
+# Particles have random size from this range
+MIN_SIZE = 3
+MAX_SIZE = 6
+SIZES = MAX_SIZE - MIN_SIZE + 1
+
+
+class ParticleSystem:
+    """
+    All particles (effects when collecting coins or killing enemies)
+    kept in numpy arrays, so they all move in one step
+    """
+    def __init__(self, capacity=PARTICLE_CAPACITY, gravity=0.2, rng=random):
+        """
+        Arrays are created once and never grow,
+        rng is random.Random of the world, so runs can be repeated
+        """
+        self.capacity = capacity
+        self.random = rng
+        self.gravity = gravity
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.life = np.zeros(capacity, dtype=np.int32)
+        # Index of the square image, made from color and size
+        self.kind = np.zeros(capacity, dtype=np.int32)
+        self.scratch = np.zeros(capacity)
+        self.colors = {}
+        self.images = []
+        self.high_water = 0
+        self.misses = 0
+        # Parts of particles and of their life which are made, lowered when frames are slow
+        self.amount_scale = 1.0
+        self.life_scale = 1.0
+
+    def __len__(self):
+        return self.count
+
+    def save_state(self):
+        """
+        Copies of arrays of living particles, for snapshots of the world
+        """
+        n = self.count
+        return n, [array[:n].copy() for array in (self.x, self.y, self.vx, self.vy, self.life, self.kind)]
+
+    def load_state(self, state):
+        """
+        Putting particles from save_state back
+        """
+        n, arrays = state
+        for array, saved in zip((self.x, self.y, self.vx, self.vy, self.life, self.kind), arrays):
+            array[:n] = saved
+        self.count = n
+
+    def color_index(self, color):
+        """
+        Giving number to every color and filling squares for it
+        """
+        index = self.colors.get(color)
+        if index is None:
+            index = len(self.colors)
+            self.colors[color] = index
+            for size in range(MIN_SIZE, MAX_SIZE + 1):
+                image = pygame.Surface((size, size))
+                image.fill(color)
+                self.images.append(image)
+        return index
+
+    def emit(self, x, y, color, amount=10):
+        """
+        Creating explosion, random size and velocity of every particle
+        """
+        if self.amount_scale != 1.0:
+            amount = max(round(amount * self.amount_scale), 1)
+        base = self.color_index(color) * SIZES
+        rng = self.random
+        for done in range(amount):
+            if self.count >= self.capacity:
+                # No free place for the rest of them
+                self.misses += amount - done
+                break
+            i = self.count
+            size = rng.randint(MIN_SIZE, MAX_SIZE)
+            # Same place as rect with center in (x, y)
+            self.x[i] = x - size // 2
+            self.y[i] = y - size // 2
+            self.vx[i] = rng.uniform(-5, 5)
+            self.vy[i] = rng.uniform(-5, 5)
+            self.life[i] = rng.randint(20, 40)  # Random time for every particle
+            if self.life_scale != 1.0:
+                self.life[i] = max(round(self.life[i] * self.life_scale), 1)
+            self.kind[i] = base + size - MIN_SIZE
+            self.count += 1
+        if self.count > self.high_water:
+            self.high_water = self.count
+
+    def stats(self):
+        """
+        Same numbers as object pools give
+        """
+        return {
+            "capacity": self.capacity,
+            "in_use": self.count,
+            "high_water": self.high_water,
+            "misses": self.misses,
+        }
+
+    def clear(self):
+        """
+        Removing all particles
+        """
+        self.count = 0
+
+    def cull(self, rect):
+        """
+        Particles outside rect die in the next update
+        """
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        outside = (x < rect.left - MAX_SIZE) | (x >= rect.right) | (y < rect.top - MAX_SIZE) | (y >= rect.bottom)
+        self.life[:n][outside] = 0
+
+    def move(self, pos, velocity):
+        """
+        Adding velocity to positions and rounding them
+        like pygame does with rect coordinates
+        """
+        half = self.scratch[:len(pos)]
+        pos += velocity
+        np.copysign(0.5, pos, out=half)
+        pos += half
+        np.trunc(pos, out=pos)
+
+    def update(self):
+        """
+        This function controls how particles move,
+        dead particles are replaced by living ones from the end
+        """
+        n = self.count
+        if n == 0:
+            return
+        vx = self.vx[:n]
+        vy = self.vy[:n]
+        vx *= 0.95
+        vy += self.gravity  # To make particles fall down
+        self.move(self.x[:n], vx)
+        self.move(self.y[:n], vy)
+        life = self.life[:n]
+        life -= 1
+
+        dead = np.flatnonzero(life <= 0)
+        if len(dead) == 0:
+            return
+        alive = n - len(dead)
+        # Holes before the new end are filled by particles after it
+        holes = dead[dead < alive]
+        movers = np.flatnonzero(life[alive:] > 0) + alive
+        for array in (self.x, self.y, self.vx, self.vy, self.life, self.kind):
+            array[holes] = array[movers]
+        self.count = alive
+
+    def draw(self, surface, scroll_x):
+        """
+        Drawing particles which are on the screen,
+        returns rect around all of them
+        """
+        n = self.count
+        if n == 0:
+            return None
+        offset = int(scroll_x)
+        width, height = surface.get_size()
+        xs = self.x[:n].astype(np.int32) - offset
+        ys = self.y[:n].astype(np.int32)
+        on_screen = np.flatnonzero((xs > -MAX_SIZE) & (xs < width) & (ys > -MAX_SIZE) & (ys < height))
+        if len(on_screen) == 0:
+            return None
+        images = self.images
+        xs = xs[on_screen]
+        ys = ys[on_screen]
+        surface.blits(
+            zip(map(images.__getitem__, self.kind[on_screen].tolist()), zip(xs.tolist(), ys.tolist())),
+            doreturn=False,
+        )
+        left = int(xs.min())
+        top = int(ys.min())
+        return pygame.Rect(left, top, int(xs.max()) + MAX_SIZE - left, int(ys.max()) + MAX_SIZE - top)
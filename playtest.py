@@ -0,0 +1,434 @@
+import os
+# Playtests run without real window and sound card
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import functools
+import json
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import pygame
+from world import (World, Inputs, MovingPlatform_x, MovingPlatform_y, TICKS_PER_SECOND, SCREEN_HEIGHT,
+                   PLAYER_SPEED, PLAYER_JUMP, PLAYER_GRAVITY)
+from level import Level, LEVEL_FILE, COIN
+from kinematics import patrol_after
+from sweep import STEP_HEIGHT
+
+# Longest game of one bot, five minutes of play by default
+PLAYTEST_TICKS = 5 * 60 * TICKS_PER_SECOND
+PLAYTEST_RUNS = 20
+PLAYTEST_SEED = 1
+# After this many deaths the bot gives up and the run is lost
+MAX_DEATHS = 10
+# Game stops as stuck when the hero neither got further nor died for this many ticks
+STUCK_LIMIT = 30 * TICKS_PER_SECOND
+# Deaths are counted in sections of the level this many pixels long
+SECTION_WIDTH = 1000
+# How far the runner looks for holes, walls and enemies in front of him
+EDGE_LOOK = 5
+WALL_LOOK = 30
+ENEMY_LOOK = 150
+SHOOT_RANGE = 500
+# Runner does not jump down where an enemy is this close
+LANDING_SPACE = 100
+# Runner jumps when he did not move forward for this many ticks
+STUCK_TICKS = 20
+# Runner waits at most this many ticks at a hole for a platform to come
+# and looks for a jump again every few ticks while waiting
+WAIT_TICKS = 180
+REPLAN_TICKS = 4
+# A jump is followed for at most this many ticks
+JUMP_TICKS = 120
+# Shorter jumps which are tried too, ticks of running right in the air
+SHORT_JUMPS = tuple(range(57, 0, -3))
+# Moving platforms and enemies are looked for this much further for every tick of a jump
+MAX_PLATFORM_SPEED = 5
+MAX_ENEMY_SPEED = 4
+# Part of ticks when the runner does something random, like a human would
+RUNNER_NOISE = 0.005
+# Random bot keeps the same buttons for this many ticks at most
+RANDOM_HOLD = 30
+
+
+def future_rect(platform, ticks):
+    """
+    Where the platform is after ticks, moved the same way as the game moves it
+    """
+    rect = platform.rect
+    if isinstance(platform, MovingPlatform_x):
+        x, _ = patrol_after(rect.x, platform.direction, platform.start_x, platform.range_dist,
+                            platform.move_speed, ticks)
+        return rect.move(int(x) - rect.x, 0)
+    if isinstance(platform, MovingPlatform_y):
+        y, _ = patrol_after(rect.y, platform.direction, platform.start_y, platform.range_dist,
+                            platform.move_speed, ticks)
+        return rect.move(0, int(y) - rect.y)
+    return rect
+
+
+class RunnerBot:
+    """
+    Plays like a simple human: runs to the right, jumps over walls and enemies,
+    waits at holes until a jump can land somewhere, stops in the air
+    for short jumps and shoots enemies in front of him.
+    Its seed gives every run its own small mistakes
+    """
+    def __init__(self, seed, noise=RUNNER_NOISE):
+        self.random = random.Random(seed)
+        self.noise = noise
+        self.last_x = None
+        self.running = False
+        self.stuck = 0
+        self.waited = 0
+        # Ticks left of running right in the jump
+        self.run = 0
+
+    def enemy_ahead(self, player, distance, height):
+        """
+        If an enemy is up to distance pixels in front of the hero
+        and at most height pixels above or below him
+        """
+        rect = player.rect
+        for enemy in player.world.enemies:
+            ahead = enemy.rect.left - rect.right
+            if -rect.width < ahead < distance and abs(enemy.rect.centery - rect.centery) < height:
+                return True
+        return False
+
+    def enemy_near(self, world, rect, space):
+        """
+        If an enemy is up to space pixels from rect
+        """
+        danger = rect.inflate(space * 2, space * 2)
+        return any(danger.colliderect(enemy.rect) for enemy in world.enemies)
+
+    def landing(self, rect, run, static, moving, enemies):
+        """
+        Top of the platform where a jump from rect running right for run ticks
+        ends with the middle of the hero on it, or None when he falls down,
+        hits something on the way or an enemy can be close to it.
+        Static are rects of platforms which stand, moving are platforms
+        and enemies are rects of enemies near the jump
+        """
+        x = rect.x
+        y = rect.y
+        velocity = PLAYER_JUMP
+        for tick in range(1, JUMP_TICKS + 1):
+            if tick <= run:
+                x += PLAYER_SPEED
+            velocity += PLAYER_GRAVITY
+            new_y = round(y + velocity)
+            body = pygame.Rect(x, new_y, rect.width, rect.height)
+            space = tick * MAX_ENEMY_SPEED
+            if body.inflate(space * 2, space * 2).collidelist(enemies) != -1:
+                return None
+            places = static + [future_rect(platform, tick) for platform in moving]
+            if velocity > 0:
+                feet = pygame.Rect(x + rect.width // 4, y + rect.height, rect.width // 2, new_y - y + 1)
+                index = feet.collidelist(places)
+                if index != -1:
+                    space += LANDING_SPACE
+                    if body.inflate(space * 2, space * 2).collidelist(enemies) != -1:
+                        return None
+                    return places[index].top
+            if body.collidelist(places) != -1:
+                # Hitting a wall or a ceiling on the way
+                return None
+            y = new_y
+            if y > SCREEN_HEIGHT:
+                return None
+        return None
+
+    def plan(self, world, rect):
+        """
+        Ticks of running in the air of the jump which lands highest,
+        the longest one of them, or None
+        """
+        reach = JUMP_TICKS * max(MAX_PLATFORM_SPEED, MAX_ENEMY_SPEED)
+        area = pygame.Rect(rect.x, rect.y - SCREEN_HEIGHT, JUMP_TICKS * PLAYER_SPEED + rect.width, SCREEN_HEIGHT * 2)
+        area.inflate_ip(reach * 2, reach * 2)
+        platforms = world.platforms.collide(area)
+        static = [platform.rect for platform in platforms if platform.static]
+        moving = [platform for platform in platforms if not platform.static]
+        enemies = [enemy.rect for enemy in world.enemies if area.colliderect(enemy.rect)]
+        best = None
+        best_top = None
+        for run in (JUMP_TICKS,) + SHORT_JUMPS:
+            top = self.landing(rect, run, static, moving, enemies)
+            if top is not None and (best_top is None or top < best_top):
+                best = run
+                best_top = top
+        return best
+
+    def __call__(self, world):
+        """
+        Buttons for the next tick
+        """
+        player = world.player
+        rect = player.rect
+        if self.running and rect.x <= self.last_x:
+            self.stuck += 1
+        else:
+            self.stuck = 0
+        self.last_x = rect.x
+        platforms = world.platforms
+        shoot = player.ammo > 0 and self.enemy_ahead(player, SHOOT_RANGE, rect.height // 2)
+        right = True
+        up = False
+        if player.on_ground:
+            self.run = JUMP_TICKS
+            hole = not platforms.collide(pygame.Rect(rect.right + EDGE_LOOK, rect.bottom, 1, STEP_HEIGHT))
+            if hole:
+                # Waiting runner looks at the way again only every few ticks
+                run = self.plan(world, rect) if self.waited % REPLAN_TICKS == 0 else None
+                if run is None and self.waited < WAIT_TICKS:
+                    # Standing at the edge until a platform comes closer,
+                    # enemies coming there are met with a jump on the spot
+                    self.waited += 1
+                    right = False
+                    if self.enemy_near(world, rect, ENEMY_LOOK):
+                        up = True
+                        self.run = 0
+                else:
+                    self.waited = 0
+                    up = True
+                    if run is not None:
+                        self.run = run
+            else:
+                self.waited = 0
+                wall = platforms.collide(pygame.Rect(rect.right, rect.top, WALL_LOOK, rect.height - STEP_HEIGHT))
+                enemy = self.enemy_ahead(player, ENEMY_LOOK, rect.height * 2)
+                up = bool(wall or enemy or self.stuck > STUCK_TICKS)
+                if up:
+                    run = self.plan(world, rect)
+                    if run is not None:
+                        self.run = run
+        else:
+            # Short jumps stop running in the air
+            right = self.run > 0
+        self.run -= 1
+        if self.random.random() < self.noise:
+            # Missing a jump or stopping for a moment
+            up = not up
+            right = self.random.random() < 0.5
+        if self.stuck > STUCK_TICKS * 3:
+            self.stuck = 0
+            self.running = False
+            return Inputs(left=True, up=up)
+        self.running = right
+        return Inputs(right=right, up=up, space=shoot)
+
+
+class RandomBot:
+    """
+    Presses random buttons for random times, more often to the right,
+    finds places where the level breaks more than places which are hard
+    """
+    def __init__(self, seed, hold=RANDOM_HOLD):
+        self.random = random.Random(seed)
+        self.hold = hold
+        self.left = 0
+        self.inputs = Inputs()
+
+    def __call__(self, world):
+        if self.left == 0:
+            rng = self.random
+            self.inputs = Inputs(left=rng.random() < 0.2, right=rng.random() < 0.8,
+                                 up=rng.random() < 0.3, space=rng.random() < 0.1)
+            self.left = rng.randint(1, self.hold)
+        self.left -= 1
+        return self.inputs
+
+
+BOTS = {"runner": RunnerBot, "random": RandomBot}
+
+
+@functools.lru_cache(maxsize=None)
+def load_level(path):
+    """
+    Level of a file, every process reads it only once
+    """
+    return Level.open(path)
+
+
+def play(task):
+    """
+    One game of a bot, task is (level file, seed, bot name, ticks, deaths, checkpoints).
+    The hero starts again after every death until he wins, dies too often,
+    gets stuck or the time is over. Coins are counted by their records,
+    so coins made again after a restart are not counted twice.
+    Returns small dict, so results come back fast
+    """
+    path, seed, bot_name, ticks, max_deaths, checkpoints = task
+    level = load_level(path)
+    world = World(level=level, seed=seed, checkpoint_distance=checkpoints)
+    bot = BOTS[bot_name](seed)
+    world.step(Inputs(space=True))
+    coins = set()
+    deaths = Counter()
+    furthest = 0
+    progress = 0
+    result = "TIMEOUT"
+    tick = 0
+    while tick < ticks:
+        tick += 1
+        if world.game_state == "LOSE":
+            if sum(deaths.values()) >= max_deaths:
+                result = "LOSE"
+                break
+            world.step(Inputs(space=True))
+            continue
+        events = world.step(bot(world))
+        x = world.player.rect.x
+        if x > furthest:
+            furthest = x
+            progress = tick
+        if "coin" in events:
+            coins.update(number for number in world.gone if level.record(number)[0] == COIN)
+        if world.game_state == "LOSE":
+            deaths[x // SECTION_WIDTH] += 1
+            progress = tick
+        elif world.game_state == "WIN":
+            result = "WIN"
+            break
+        elif tick - progress > STUCK_LIMIT:
+            result = "STUCK"
+            break
+    return {
+        "level": path,
+        "seed": seed,
+        "bot": bot_name,
+        "result": result,
+        "ticks": tick,
+        "coins": len(coins),
+        "deaths": dict(deaths),
+        "furthest_x": furthest,
+    }
+
+
+def make_tasks(levels, bots, runs, seed, ticks, max_deaths, checkpoints):
+    """
+    Runs of every bot on every level, run i has seed + i,
+    so the same command always plays the same games
+    """
+    return [(path, seed + i, bot, ticks, max_deaths, checkpoints)
+            for path in levels for bot in bots for i in range(runs)]
+
+
+def summary(results):
+    """
+    Results of runs of one bot on one level put together
+    """
+    wins = [result["ticks"] for result in results if result["result"] == "WIN"]
+    deaths = Counter()
+    for result in results:
+        deaths.update(result["deaths"])
+    runs = len(results)
+    return {
+        "level": results[0]["level"],
+        "bot": results[0]["bot"],
+        "runs": runs,
+        "wins": len(wins),
+        "losses": sum(result["result"] == "LOSE" for result in results),
+        "stuck": sum(result["result"] == "STUCK" for result in results),
+        "timeouts": sum(result["result"] == "TIMEOUT" for result in results),
+        "win_rate": round(len(wins) / runs, 3),
+        "ticks_to_flag": {
+            "mean": round(sum(wins) / len(wins), 1),
+            "min": min(wins),
+            "max": max(wins),
+        } if wins else None,
+        "coins": round(sum(result["coins"] for result in results) / runs, 2),
+        "deaths": round(sum(deaths.values()) / runs, 2),
+        # Start of the section in pixels and all deaths there
+        "deaths_per_section": {section * SECTION_WIDTH: count for section, count in sorted(deaths.items())},
+        "furthest_x": round(sum(result["furthest_x"] for result in results) / runs),
+    }
+
+
+def check(summaries, min_win_rate=None, max_win_rate=None, max_deaths=None):
+    """
+    Messages about levels which became too hard or too easy, empty when all is fine
+    """
+    failures = []
+    for entry in summaries:
+        name = f"{entry['level']} ({entry['bot']})"
+        if min_win_rate is not None and entry["win_rate"] < min_win_rate:
+            failures.append(f"{name}: win rate {entry['win_rate']} is below {min_win_rate}")
+        if max_win_rate is not None and entry["win_rate"] > max_win_rate:
+            failures.append(f"{name}: win rate {entry['win_rate']} is above {max_win_rate}")
+        if max_deaths is not None and entry["deaths"] > max_deaths:
+            failures.append(f"{name}: {entry['deaths']} deaths per run is above {max_deaths}")
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless playtests of levels by bots on many processes")
+    parser.add_argument("--level", action="append", default=[], help=f"level file, {LEVEL_FILE} when none is given")
+    parser.add_argument("--bot", action="append", default=[], choices=sorted(BOTS),
+                        help="bot which plays, runner when none is given")
+    parser.add_argument("--runs", type=int, default=PLAYTEST_RUNS, help="games of every bot on every level")
+    parser.add_argument("--seed", type=int, default=PLAYTEST_SEED, help="seed of the first game")
+    parser.add_argument("--ticks", type=int, default=PLAYTEST_TICKS, help="longest game")
+    parser.add_argument("--max-deaths", type=int, default=MAX_DEATHS, help="deaths before the bot gives up")
+    parser.add_argument("--checkpoints", type=int, help="distance between checkpoints in pixels")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="processes, one for every core by default")
+    parser.add_argument("--details", action="store_true", help="add result of every game")
+    parser.add_argument("--min-win-rate", type=float, help="fail when a level is won less often")
+    parser.add_argument("--max-win-rate", type=float, help="fail when a level is won more often")
+    parser.add_argument("--max-mean-deaths", type=float, help="fail when bots die more often per game")
+    parser.add_argument("--output", help="JSON file for results, printed when not given")
+    return parser.parse_args(argv)
+
+
+def playtest(argv=None):
+    """
+    Playing all games on a pool of processes and writing results as JSON,
+    returns 1 when a level did not pass the limits
+    """
+    args = parse_args(argv)
+    tasks = make_tasks(args.level or [LEVEL_FILE], args.bot or ["runner"], args.runs, args.seed,
+                       args.ticks, args.max_deaths, args.checkpoints)
+    jobs = max(1, min(args.jobs or 1, len(tasks)))
+    started = time.perf_counter()
+    if jobs == 1:
+        results = [play(task) for task in tasks]
+    else:
+        # Few big pieces of work for every process, but enough to share them evenly
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(play, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+    seconds = time.perf_counter() - started
+    groups = {}
+    for result in results:
+        groups.setdefault((result["level"], result["bot"]), []).append(result)
+    summaries = [summary(group) for group in groups.values()]
+    failures = check(summaries, args.min_win_rate, args.max_win_rate, args.max_mean_deaths)
+    ticks = sum(result["ticks"] for result in results)
+    output = {
+        "jobs": jobs,
+        "games": len(results),
+        "seconds": round(seconds, 3),
+        "games_per_s": round(len(results) / seconds, 2) if seconds else None,
+        "ticks_per_s": round(ticks / seconds, 1) if seconds else None,
+        "levels": summaries,
+        "failures": failures,
+    }
+    if args.details:
+        output["games_played"] = results
+    text = json.dumps(output, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(playtest())
@@ -0,0 +1,55 @@
+class Pool:
+    """
+    Fixed number of objects which are used again and again,
+    nothing new is created while the game is running
+    """
+    def __init__(self, factory, capacity):
+        """
+        Creating all objects at the start, factory gets the pool
+        """
+        self.capacity = capacity
+        self.items = [factory(self) for _ in range(capacity)]
+        self.free = list(self.items)
+        self.high_water = 0
+        self.misses = 0
+
+    @property
+    def in_use(self):
+        return self.capacity - len(self.free)
+
+    def acquire(self, *args):
+        """
+        Taking free object and resetting it with args,
+        returns None when every object is used
+        """
+        if not self.free:
+            self.misses += 1
+            return None
+        item = self.free.pop()
+        item.reset(*args)
+        if self.in_use > self.high_water:
+            self.high_water = self.in_use
+        return item
+
+    def release(self, item):
+        """
+        Giving object back to the pool
+        """
+        self.free.append(item)
+
+    def release_all(self):
+        """
+        Every object is free again, e.g. after restart
+        """
+        self.free[:] = self.items
+
+    def stats(self):
+        """
+        Numbers which help to choose size of the pool
+        """
+        return {
+            "capacity": self.capacity,
+            "in_use": self.in_use,
+            "high_water": self.high_water,
+            "misses": self.misses,
+        }
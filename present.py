@@ -0,0 +1,91 @@
+import pygame
+
+# When camera moved more pixels than this the whole screen is sent,
+# background moves with the camera, so bigger values leave old pixels on the screen
+PRESENT_SCROLL_THRESHOLD = 0
+
+
+class Presenter:
+    """
+    Sends finished frame to the window, whole with flip
+    or in dirty mode only parts which changed
+    """
+    def __init__(self, dirty=False, scroll_threshold=PRESENT_SCROLL_THRESHOLD):
+        """
+        Nothing is on the window yet
+        """
+        self.dirty = dirty
+        self.scroll_threshold = scroll_threshold
+        self.static_state = None
+        self.last_scroll = None
+        self.sprites = {}
+        self.last_sprites = {}
+        self.areas = {}
+        self.last_areas = {}
+        self.changed = []
+
+    def invalidate(self):
+        """
+        Window must be sent whole again, e.g. when it was covered
+        """
+        self.static_state = None
+        self.last_scroll = None
+
+    def static_ready(self, state):
+        """
+        True when static screen for state is already on the window,
+        then nothing has to be drawn
+        """
+        return self.dirty and state == self.static_state
+
+    def present_static(self, state):
+        """
+        Sending static screen, in dirty mode only once
+        """
+        pygame.display.flip()
+        self.static_state = state
+        self.last_scroll = None
+
+    def track(self, sprite, rect, image):
+        """
+        Remembering where sprite was drawn, when it changed
+        its old and new place must be sent
+        """
+        self.sprites[sprite] = (rect, image)
+        old = self.last_sprites.pop(sprite, None)
+        if old is None:
+            self.changed.append(rect)
+        elif old[0] != rect or old[1] is not image:
+            self.changed.append(rect)
+            self.changed.append(old[0])
+
+    def area(self, key, rect):
+        """
+        Part of the screen which changes every frame (particles, texts),
+        its old and new place are always sent
+        """
+        if rect:
+            self.areas[key] = rect
+            self.changed.append(rect)
+
+    def present_game(self, scroll_x):
+        """
+        Sending game frame, whole when camera moved
+        """
+        scroll = int(scroll_x)
+        self.static_state = None
+        full = (not self.dirty or self.last_scroll is None
+                or abs(scroll - self.last_scroll) > self.scroll_threshold)
+        if full:
+            pygame.display.flip()
+        else:
+            # Sprites which disappeared and last places of areas
+            self.changed.extend(old[0] for old in self.last_sprites.values())
+            self.changed.extend(self.last_areas.values())
+            pygame.display.update(self.changed)
+        self.last_scroll = scroll
+        self.last_sprites, self.sprites = self.sprites, self.last_sprites
+        self.last_areas, self.areas = self.areas, self.last_areas
+        self.sprites.clear()
+        self.areas.clear()
+        self.changed.clear()
@@ -0,0 +1,197 @@
+import csv
+import json
+import time
+from collections import deque
+import numpy as np
+import pygame
+
+# How many last frames are kept for the overlay
+PROFILE_HISTORY = 240
+# Frame time which still gives 60 FPS (in milliseconds)
+FRAME_BUDGET = 1000 / 60
+# Columns of the output file, in the order of the main loop
+PROFILE_PHASES = [
+    "events", "update", "collide_bullets", "collide_coins", "collide_enemies", "collide_goal", "checkpoint",
+    "sounds", "background", "geometry", "sprites", "particles", "hud", "overlay", "present", "wait",
+]
+PROFILE_COUNTS = [
+    "substeps", "quality", "all_sprites", "awake", "platforms", "enemies", "coins", "bullets", "live_particles",
+]
+GRAPH_SIZE = (PROFILE_HISTORY, 60)
+COLOR_OVERLAY = (0, 0, 0, 170)
+# Overlay is made again after this many frames
+OVERLAY_REFRESH = 10
+
+
+class FrameProfiler:
+    """
+    Measures how long every part of the frame takes.
+    Main loop calls mark after every part, time since the last mark
+    belongs to that part. While disabled the game does not call it at all
+    """
+    def __init__(self, history=PROFILE_HISTORY, path=None):
+        """
+        Samples are written to path (.csv or .jsonl) when it is given
+        """
+        self.history = history
+        self.path = path
+        self.frames = deque(maxlen=history)
+        self.overlay = False
+        self.frame = None
+        self.number = 0
+        self.last = 0.0
+        self.file = None
+        self.writer = None
+
+    @property
+    def enabled(self):
+        """
+        Profiler works while overlay is shown or samples are saved
+        """
+        return self.overlay or self.path is not None
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        self.frames.clear()
+
+    def begin_frame(self):
+        self.frame = dict.fromkeys(PROFILE_PHASES, 0.0)
+        self.last = time.perf_counter()
+
+    def mark(self, phase):
+        """
+        Time since the last mark is added to phase (in milliseconds)
+        """
+        now = time.perf_counter()
+        self.frame[phase] += (now - self.last) * 1000
+        self.last = now
+
+    def count(self, name, value):
+        self.frame[name] = value
+
+    def end_frame(self):
+        """
+        Frame is finished, it goes to history and to the file
+        """
+        frame = self.frame
+        frame["frame"] = self.number
+        frame["total"] = sum(frame[phase] for phase in PROFILE_PHASES)
+        self.number += 1
+        self.frames.append(frame)
+        if self.path is not None:
+            self.write(frame)
+        self.frame = None
+
+    def write(self, frame):
+        if self.file is None:
+            self.file = open(self.path, "w", newline="")
+            if self.path.endswith(".csv"):
+                fields = ["frame", "total"] + PROFILE_PHASES + PROFILE_COUNTS
+                self.writer = csv.DictWriter(self.file, fields, restval="", extrasaction="ignore")
+                self.writer.writeheader()
+        if self.writer is not None:
+            self.writer.writerow({key: round(value, 4) if isinstance(value, float) else value
+                                  for key, value in frame.items()})
+        else:
+            self.file.write(json.dumps(frame) + "\n")
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.writer = None
+
+    def stats(self):
+        """
+        FPS and percentiles of frame time from the history
+        """
+        if not self.frames:
+            return None
+        totals = np.array([frame["total"] for frame in self.frames])
+        work = totals - np.array([frame["wait"] for frame in self.frames])
+        p50, p95, p99 = np.percentile(work, [50, 95, 99])
+        return {
+            "fps": 1000 / totals.mean() if totals.mean() else 0.0,
+            "mean": work.mean(),
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+            "max": work.max(),
+        }
+
+
+class ProfilerOverlay:
+    """
+    Graph of frame times and statistics drawn over the game,
+    it is made again only every few frames because rendering texts is slow
+    """
+    def __init__(self, font, refresh=OVERLAY_REFRESH):
+        self.font = font
+        self.refresh = refresh
+        self.graph = pygame.Surface(GRAPH_SIZE, pygame.SRCALPHA)
+        self.image = None
+        self.age = 0
+
+    def lines(self, profiler):
+        """
+        Texts of the overlay, slowest parts of the frame first
+        """
+        stats = profiler.stats()
+        if stats is None:
+            return []
+        last = profiler.frames[-1]
+        lines = [
+            f"FPS {stats['fps']:.1f}  frame {stats['mean']:.2f} ms",
+            f"p50 {stats['p50']:.2f}  p95 {stats['p95']:.2f}",
+            f"p99 {stats['p99']:.2f}  max {stats['max']:.2f}",
+        ]
+        phases = sorted((phase for phase in PROFILE_PHASES if phase != "wait"), key=last.get, reverse=True)
+        for phase in phases[:5]:
+            lines.append(f"{phase} {last[phase]:.2f} ms")
+        counts = [f"{name} {last[name]}" for name in PROFILE_COUNTS if name in last]
+        for i in range(0, len(counts), 2):
+            lines.append("  ".join(counts[i:i + 2]))
+        return lines
+
+    def draw_graph(self, profiler):
+        """
+        One bar for every frame, line shows the 60 FPS budget
+        """
+        width, height = GRAPH_SIZE
+        self.graph.fill(COLOR_OVERLAY)
+        scale = height / (2 * FRAME_BUDGET)
+        offset = width - len(profiler.frames)
+        for i, frame in enumerate(profiler.frames):
+            work = frame["total"] - frame["wait"]
+            bar = min(int(work * scale), height)
+            color = "green" if work <= FRAME_BUDGET else "red"
+            pygame.draw.line(self.graph, color, (offset + i, height - 1), (offset + i, height - bar))
+        budget_y = height - int(FRAME_BUDGET * scale)
+        pygame.draw.line(self.graph, "white", (0, budget_y), (width, budget_y))
+
+    def make_image(self, profiler):
+        """
+        Graph with texts under it on one surface
+        """
+        texts = [self.font.render(line, True, "white") for line in self.lines(profiler)]
+        line_height = self.font.get_linesize()
+        width, height = GRAPH_SIZE
+        for text in texts:
+            width = max(width, text.get_width() + 8)
+        image = pygame.Surface((width, height + line_height * len(texts)), pygame.SRCALPHA)
+        image.fill(COLOR_OVERLAY)
+        self.draw_graph(profiler)
+        image.blit(self.graph, (0, 0))
+        for i, text in enumerate(texts):
+            image.blit(text, (4, height + i * line_height))
+        return image
+
+    def draw(self, surface, profiler, topright):
+        """
+        Drawing overlay on surface, returns its rect
+        """
+        if self.image is None or self.age >= self.refresh:
+            self.image = self.make_image(profiler)
+            self.age = 0
+        self.age += 1
+        return surface.blit(self.image, self.image.get_rect(topright=topright))
@@ -0,0 +1,132 @@
+import argparse
+import hashlib
+import struct
+import sys
+import time
+import numpy as np
+from world import World, Inputs
+
+# Replay file starts with this header, digest is state of the world at the end,
+# version changes when rules of the world change, old replays would go differently
+REPLAY_MAGIC = b"SKYR"
+REPLAY_VERSION = 4
+HEADER = struct.Struct("<4sHqII20s")
+# Inputs are saved as runs of the same buttons
+RUN = np.dtype([("mask", "u1"), ("count", "<u4")])
+# Bit of every button in the mask
+BUTTONS = {"left": 1, "right": 2, "up": 4, "space": 8}
+# Inputs for every possible mask
+MASK_INPUTS = [Inputs(*(bool(mask & bit) for bit in BUTTONS.values())) for mask in range(16)]
+
+
+def input_mask(inputs):
+    """
+    Buttons of one tick as one number
+    """
+    mask = 0
+    for pressed, bit in zip(inputs, BUTTONS.values()):
+        if pressed:
+            mask |= bit
+    return mask
+
+
+def world_digest(world):
+    """
+    Hash of everything what can change in the world,
+    two runs are the same only when their digests are the same
+    """
+    digest = hashlib.sha1()
+    digest.update(repr((world.ticks, world.game_state, float(world.scroll_x).hex())).encode())
+    player = world.player
+    if player is not None:
+        digest.update(repr((tuple(player.rect), float(player.velocity_y).hex(), player.ammo)).encode())
+    for sprite in world.all_sprites:
+        digest.update(struct.pack("<4i", *sprite.rect))
+    particles = world.particles
+    for array in (particles.x, particles.y, particles.vx, particles.vy, particles.life):
+        digest.update(array[:particles.count].tobytes())
+    return digest.digest()
+
+
+class InputRecorder:
+    """
+    Remembers buttons of every tick of the world
+    """
+    def __init__(self, seed):
+        """
+        Seed must be the seed of the recorded world
+        """
+        self.seed = seed
+        self.masks = []
+
+    def record(self, inputs):
+        self.masks.append(input_mask(inputs))
+
+    def save(self, path, world):
+        """
+        Writing runs of inputs and the final state of world
+        """
+        masks = np.array(self.masks, dtype="u1")
+        # Run starts where the mask is different from the previous one
+        starts = np.flatnonzero(np.diff(masks.astype(np.int16), prepend=-1))
+        runs = np.zeros(len(starts), dtype=RUN)
+        runs["mask"] = masks[starts]
+        runs["count"] = np.diff(np.append(starts, len(masks)))
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed,
+                                   len(masks), len(runs), world_digest(world)))
+            file.write(runs.tobytes())
+
+
+def load_replay(path):
+    """
+    Reading replay file, returns seed, masks of all ticks and final digest
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    magic, version, seed, ticks, length, digest = HEADER.unpack_from(data)
+    if magic != REPLAY_MAGIC:
+        raise ValueError(f"{path} is not a replay file")
+    if version != REPLAY_VERSION:
+        raise ValueError(f"{path} has replay version {version}, expected {REPLAY_VERSION}")
+    runs = np.frombuffer(data, dtype=RUN, count=length, offset=HEADER.size)
+    masks = np.repeat(runs["mask"], runs["count"])
+    if len(masks) != ticks:
+        raise ValueError(f"{path} is damaged")
+    return seed, masks, digest
+
+
+def replay_inputs(masks):
+    """
+    Inputs for every tick of the replay
+    """
+    return [MASK_INPUTS[mask] for mask in masks.tolist()]
+
+
+def replay(path, level=None):
+    """
+    Playing replay without window as fast as possible,
+    returns how long it took and if the end is the same as recorded
+    """
+    seed, masks, digest = load_replay(path)
+    world = World(level=level, seed=seed)
+    inputs = replay_inputs(masks)
+    started = time.perf_counter()
+    for tick_inputs in inputs:
+        world.step(tick_inputs)
+    seconds = time.perf_counter() - started
+    return {
+        "ticks": len(inputs),
+        "seconds": round(seconds, 3),
+        "ticks_per_s": round(len(inputs) / seconds, 1) if seconds else None,
+        "state": world.game_state,
+        "exact": world_digest(world) == digest,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless replay of recorded game")
+    parser.add_argument("path", help="file made by main.py --record")
+    result = replay(parser.parse_args().path)
+    print(result)
+    sys.exit(0 if result["exact"] else 1)
@@ -0,0 +1,158 @@
+import pygame
+
+# Size of one square cell of the world grid (in pixels)
+CELL_SIZE = 256
+
+
+class SpatialHash:
+    """
+    Uniform grid which remembers in which world cells
+    every sprite is, so we only check sprites near us
+    """
+    def __init__(self, cell_size=CELL_SIZE):
+        """
+        Empty grid
+        """
+        self.cell_size = cell_size
+        self.cells = {}
+        self.sprite_cells = {}
+        self.sprite_bounds = {}
+        self.order = {}
+        self.counter = 0
+
+    def bounds(self, rect):
+        """
+        First and last column and row of cells covered by rect
+        """
+        if rect.width <= 0 or rect.height <= 0:
+            return None
+        size = self.cell_size
+        return rect.left // size, (rect.right - 1) // size, rect.top // size, (rect.bottom - 1) // size
+
+    def cells_for(self, rect, bounds=None):
+        """
+        Returns all cells covered by rect
+        """
+        if bounds is None:
+            bounds = self.bounds(rect)
+            if bounds is None:
+                return ()
+        left, right, top, bottom = bounds
+        return tuple((cx, cy) for cx in range(left, right + 1) for cy in range(top, bottom + 1))
+
+    def add(self, sprite):
+        """
+        Putting sprite into the grid
+        """
+        if sprite in self.sprite_cells:
+            self.remove(sprite)
+        bounds = self.bounds(sprite.rect)
+        keys = self.cells_for(sprite.rect, bounds) if bounds else ()
+        for key in keys:
+            self.cells.setdefault(key, []).append(sprite)
+        self.sprite_cells[sprite] = keys
+        self.sprite_bounds[sprite] = bounds
+        # Remember the order so results are the same as in pygame groups,
+        # sprites with lower _layer go first
+        self.order[sprite] = (getattr(sprite, "_layer", 0), self.counter)
+        self.counter += 1
+
+    def remove(self, sprite):
+        """
+        Taking sprite out of the grid
+        """
+        keys = self.sprite_cells.pop(sprite, None)
+        if keys is None:
+            return
+        del self.order[sprite]
+        del self.sprite_bounds[sprite]
+        for key in keys:
+            bucket = self.cells[key]
+            bucket.remove(sprite)
+            if not bucket:
+                del self.cells[key]
+
+    def move(self, sprite):
+        """
+        Updating cells of a sprite after it moved,
+        nothing happens while it stays in the same cells
+        """
+        if sprite not in self.sprite_bounds:
+            return
+        bounds = self.bounds(sprite.rect)
+        if bounds == self.sprite_bounds[sprite]:
+            return
+        old_keys = self.sprite_cells[sprite]
+        new_keys = self.cells_for(sprite.rect, bounds) if bounds else ()
+        self.sprite_bounds[sprite] = bounds
+        for key in old_keys:
+            bucket = self.cells[key]
+            bucket.remove(sprite)
+            if not bucket:
+                del self.cells[key]
+        for key in new_keys:
+            self.cells.setdefault(key, []).append(sprite)
+        self.sprite_cells[sprite] = new_keys
+
+    def clear(self):
+        """
+        Removing everything from the grid
+        """
+        self.cells.clear()
+        self.sprite_cells.clear()
+        self.sprite_bounds.clear()
+        self.order.clear()
+
+    def query(self, rect):
+        """
+        Returns sprites colliding with rect
+        in the same order as pygame.sprite.spritecollide
+        """
+        found = []
+        seen = set()
+        cells = self.cells
+        for key in self.cells_for(rect):
+            bucket = cells.get(key)
+            if not bucket:
+                continue
+            for sprite in bucket:
+                if sprite not in seen:
+                    seen.add(sprite)
+                    if rect.colliderect(sprite.rect):
+                        found.append(sprite)
+        if len(found) > 1:
+            found.sort(key=self.order.__getitem__)
+        return found
+
+
+class SpatialGroup(pygame.sprite.Group):
+    """
+    Sprite group with spatial hash inside,
+    used for platforms
+    """
+    def __init__(self, *sprites, cell_size=CELL_SIZE):
+        """
+        Creating group and its grid
+        """
+        self.grid = SpatialHash(cell_size)
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.grid.add(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.grid.remove(sprite)
+
+    def moved(self, sprite):
+        """
+        Must be called when sprite from this group changed its rect
+        """
+        self.grid.move(sprite)
+
+    def collide(self, rect):
+        """
+        Same result as spritecollide but checks only nearby cells
+        """
+        return self.grid.query(rect)
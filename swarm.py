@@ -0,0 +1,49 @@
+import numpy as np
+from batch import SpriteBatch
+
+# Flies start to hunt the hero when he is closer than this
+HUNT_DISTANCE = 1000
+
+
+class Swarm(SpriteBatch):
+    """
+    All flies kept in numpy arrays, so they all move in one step
+    """
+    FIELDS = {"speed": np.float64}
+
+    def __init__(self, hunt_distance=HUNT_DISTANCE, **kwargs):
+        """
+        Empty swarm
+        """
+        self.hunt_distance = hunt_distance
+        super().__init__(**kwargs)
+
+    def update(self, target_x, target_y, rects):
+        """
+        Moving every fly closer than hunt distance towards target,
+        returns (sprite, x, y, facing_right) of flies which are
+        or were inside any of rects
+        """
+        n = self.count
+        if n == 0:
+            return []
+        x = self.x[:n]
+        y = self.y[:n]
+        # Same numbers as rect.centerx of the fly
+        dx = target_x - (x.astype(np.int64) + self.width[:n] // 2)
+        dy = target_y - (y.astype(np.int64) + self.height[:n] // 2)
+        squared = dx * dx + dy * dy
+        hunting = np.flatnonzero((squared < self.hunt_distance ** 2) & (squared != 0))
+        if len(hunting):
+            distance = np.sqrt(squared[hunting])
+            speed = self.speed[hunting]
+            x[hunting] += dx[hunting] / distance * speed
+            y[hunting] += dy[hunting] / distance * speed
+
+        rect_x = x.astype(np.int64)
+        rect_y = y.astype(np.int64)
+        synced = self.touched(rect_x, rect_y, rects)
+        sprites = self.sprites
+        return [(sprites[i], rx, ry, right)
+                for i, rx, ry, right in zip(synced.tolist(), rect_x[synced].tolist(),
+                                            rect_y[synced].tolist(), (dx[synced] > 0).tolist())]
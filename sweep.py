@@ -0,0 +1,59 @@
+import math
+
+# Hero walks up onto platforms whose top is at most this much above his feet,
+# and stays on the ground which is at most this much below them
+STEP_HEIGHT = 15
+
+
+def axis_times(start, end, other_start, other_end, distance):
+    """
+    Parts of the move when two segments on one axis start and stop overlapping,
+    the first one moves by distance, the other one stands
+    """
+    if distance > 0:
+        return (other_start - end) / distance, (other_end - start) / distance
+    if distance < 0:
+        return (other_end - start) / distance, (other_start - end) / distance
+    if start < other_end and end > other_start:
+        return -math.inf, math.inf
+    return math.inf, -math.inf
+
+
+def time_of_impact(rect, dx, dy, other, other_dx=0, other_dy=0):
+    """
+    Part of the move (0 to 1) when rect moving by (dx, dy) first overlaps other,
+    other is where it ended after moving by (other_dx, other_dy) in the same time.
+    0 when they overlap from the start to the end, None when they do not meet
+    or when rect gets out of other which it overlapped at the start
+    """
+    # Other stands still and rect moves by the difference
+    left = other.left - other_dx
+    top = other.top - other_dy
+    enter_x, leave_x = axis_times(rect.left, rect.right, left, left + other.width, dx - other_dx)
+    enter_y, leave_y = axis_times(rect.top, rect.bottom, top, top + other.height, dy - other_dy)
+    enter = max(enter_x, enter_y)
+    leave = min(leave_x, leave_y)
+    if enter >= leave or enter >= 1 or leave <= 0 or (enter < 0 and leave <= 1):
+        return None
+    return max(enter, 0.0)
+
+
+def first_impact(rect, dx, dy, obstacles, skip=None):
+    """
+    Obstacle which rect moving by (dx, dy) meets first and the part of the move
+    when it happens, or (None, 1.0). Obstacles tell how they moved by velocity,
+    with the same time the one which comes first in obstacles wins.
+    Skip can leave out obstacles which are not in the way
+    """
+    first = 1.0
+    hit = None
+    for obstacle in obstacles:
+        if skip is not None and skip(obstacle):
+            continue
+        other_dx, other_dy = obstacle.velocity
+        time = time_of_impact(rect, dx, dy, obstacle.rect, other_dx, other_dy)
+        if time is not None and time < first:
+            first = time
+            hit = obstacle
+    return hit, first
+
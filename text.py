@@ -0,0 +1,58 @@
+from collections import OrderedDict
+
+# How many rendered texts are remembered
+TEXT_CACHE_SIZE = 128
+
+
+class TextCache:
+    """
+    Remembers rendered texts, so the same text
+    is not rendered again every frame
+    """
+    def __init__(self, max_items=TEXT_CACHE_SIZE):
+        """
+        Empty cache, the oldest texts are removed when it is full
+        """
+        self.max_items = max_items
+        self.items = OrderedDict()
+
+    def render(self, font, text, color, antialias=True):
+        """
+        Same as font.render, but only the first time
+        """
+        key = (font, text, color, antialias)
+        surface = self.items.get(key)
+        if surface is None:
+            surface = font.render(text, antialias, color)
+            self.items[key] = surface
+            if len(self.items) > self.max_items:
+                self.items.popitem(last=False)
+        else:
+            self.items.move_to_end(key)
+        return surface
+
+
+class Label:
+    """
+    Text on the screen which shows one value,
+    it is rendered again only when the value changes
+    """
+    def __init__(self, cache, font, template, color):
+        """
+        Template is text with {} where the value goes
+        """
+        self.cache = cache
+        self.font = font
+        self.template = template
+        self.color = color
+        self.value = None
+        self.image = None
+
+    def draw(self, surface, pos, value):
+        """
+        Drawing label with current value, returns its rect
+        """
+        if self.image is None or value != self.value:
+            self.value = value
+            self.image = self.cache.render(self.font, self.template.format(value), self.color)
+        return surface.blit(self.image, pos)
@@ -0,0 +1,109 @@
+import pygame
+from world import SCREEN_WIDTH, SCREEN_HEIGHT
+from assets import load_image
+from camera import camera_rect, DRAW_MARGIN
+from text import Label
+from background import Background
+from baked import BakedGeometry
+
+# Actors which moved more in one tick jumped there, they are not drawn in between
+TELEPORT_DISTANCE = 64
+# Fonts of information in the game, as (name, size)
+UI_FONT = ("freesansbold.ttf", 24)
+AMMO_FONT = ("freesansbold.ttf", 30)
+
+
+def between(old, new, alpha):
+    """
+    Place part alpha of the way from old to new, jumps are not smoothed
+    """
+    if abs(new - old) > TELEPORT_DISTANCE:
+        return new
+    return old + (new - old) * alpha
+
+
+class GameView:
+    """
+    Draws the world during the game: background, platforms, actors near
+    the screen, particles and information. The game and the benchmark
+    both use it, it needs the window to exist
+    """
+    def __init__(self, screen, presenter, text_cache, ui_font, ammo_font):
+        """
+        Background image, flipped to make smooth transition,
+        tiles are put together on the sky once and drawn with one blit.
+        Platforms which never move are drawn into chunks once
+        """
+        self.screen = screen
+        self.presenter = presenter
+        self.text_cache = text_cache
+        self.ui_font = ui_font
+        self.ammo_label = Label(text_cache, ammo_font, "AMMO: {}", "black")
+        self.background = Background((SCREEN_WIDTH, SCREEN_HEIGHT), "skyblue")
+        self.background.add_layer(load_image("background.png", (SCREEN_WIDTH, SCREEN_HEIGHT)).convert_alpha())
+        self.geometry = BakedGeometry((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+    def remember_places(self, world):
+        """
+        Camera and places of actors near the screen before the last tick of the frame
+        """
+        view = camera_rect(world.scroll_x, SCREEN_WIDTH, SCREEN_HEIGHT, DRAW_MARGIN)
+        return world.scroll_x, {sprite: sprite.rect.topleft for sprite in world.all_sprites.visible(view)}
+
+    def draw_ui(self, world):
+        """
+        Information in game about ammo and settings
+        """
+        screen = self.screen
+        presenter = self.presenter
+        ammo_rect = self.ammo_label.draw(screen, (20, 20), world.player.ammo)
+        help_text = self.text_cache.render(self.ui_font, "Arrows: Move | Space: Shoot", (50, 50, 50))
+        help_rect = screen.blit(help_text, (20, 55))
+        if presenter.dirty:
+            presenter.area("ammo", ammo_rect)
+            presenter.area("help", help_rect)
+
+    def draw(self, world, places=None, alpha=1.0, layers=None):
+        """
+        Background, all actors near the screen and information.
+        With places from remember_places frame is drawn part alpha
+        of the way from them to the world after the last tick,
+        with layers only so many background layers are drawn
+        """
+        screen = self.screen
+        presenter = self.presenter
+        scroll_x = world.scroll_x
+        old_places = {}
+        if places is not None:
+            old_scroll, old_places = places
+            scroll_x = between(old_scroll, scroll_x, alpha)
+        profiler = world.profiler
+        self.background.draw(screen, scroll_x, layers)
+        if profiler:
+            profiler.mark("background")
+        self.geometry.draw(screen, scroll_x, world.platforms, world.level)
+        if profiler:
+            profiler.mark("geometry")
+
+        # Creating all actors, only these near the screen
+        for sprite in world.all_sprites.visible(camera_rect(scroll_x, SCREEN_WIDTH, SCREEN_HEIGHT, DRAW_MARGIN)):
+            x, y = sprite.rect.topleft
+            old = old_places.get(sprite)
+            if old is not None:
+                x = round(between(old[0], x, alpha))
+                y = round(between(old[1], y, alpha))
+            rect = screen.blit(sprite.image, (x - int(scroll_x), y))
+            if presenter.dirty:
+                presenter.track(sprite, rect, sprite.image)
+        if profiler:
+            profiler.mark("sprites")
+        particles_rect = world.particles.draw(screen, scroll_x)
+        if presenter.dirty:
+            presenter.area("particles", particles_rect)
+        if profiler:
+            profiler.mark("particles")
+
+        self.draw_ui(world)
+        if profiler:
+            profiler.mark("hud")
+        return scroll_x
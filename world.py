@@ -0,0 +1,1180 @@
+import os
+import random
+import pygame
+import math
+from collections import namedtuple
+from spatial import SpatialGroup
+from particles import ParticleSystem
+from pools import Pool
+from swarm import Swarm
+from kinematics import Kinematics, patrol_after, PATROL_X, PATROL_Y
+from images import ImageCache
+from assets import load_image
+from camera import ActivityGroup, camera_rect, ACTIVITY_RADIUS, DRAW_MARGIN
+from sweep import first_impact, STEP_HEIGHT
+from level import Level, LEVEL_FILE, builtin_records, PLATFORM, MOVING_X, MOVING_Y, ENEMY, FLYER, COIN, GOAL
+
+# Game rules, the world works without window, sounds and fonts
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+PLAYER_SPEED = 7
+PLAYER_JUMP = -17
+PLAYER_GRAVITY = 0.8
+# Game is made for 60 ticks per second, times in milliseconds are turned into ticks
+TICKS_PER_SECOND = 60
+SHOOT_DELAY = 400
+SHOOT_DELAY_TICKS = SHOOT_DELAY * TICKS_PER_SECOND // 1000
+GRAVITY_PARTICLE = 0.2
+BULLET_SPEED = 12
+PLATFORM_SPEED_X = 2
+PLATFORM_SPEED_Y = 4
+# Length of levels made by bench.py, the world takes it from its level
+MAP_LENGTH = 10000
+BULLET_POOL_SIZE = 32
+# Level is made in chunks, one column of the level index each.
+# Chunks where sprites are awake must exist, they are made before the camera
+# comes there: up to LOAD_RADIUS they are needed soon, up to PREFETCH_RADIUS
+# they are made ahead. Behind RELEASE_RADIUS chunks are removed
+LOAD_RADIUS = ACTIVITY_RADIUS + 512
+PREFETCH_RADIUS = LOAD_RADIUS + 1024
+RELEASE_RADIUS = PREFETCH_RADIUS + 1024
+# About how many microseconds making one sprite of each kind takes, catching up
+# included. In one tick sprites are made until LOAD_BUDGET of them is used for chunks
+# which are needed soon, or PREFETCH_BUDGET for the other ones.
+# Guesses are used and not the clock, so every run of a replay has the same sprites
+SPAWN_COSTS = {PLATFORM: 10, MOVING_X: 30, MOVING_Y: 30, ENEMY: 20, FLYER: 15, COIN: 30, GOAL: 30}
+PREFETCH_BUDGET = 500
+LOAD_BUDGET = 2000
+# Chunks removed in one tick, so no tick gets much longer
+RELEASES_PER_TICK = 1
+
+# Buttons pressed during one tick
+Inputs = namedtuple("Inputs", ["left", "right", "up", "space"], defaults=[False, False, False, False])
+# Everything in the world which can change, made by World.snapshot.
+# Sprites are saved only by numbers of their records and their states,
+# so snapshots keep no sprites or images and can be pickled.
+# Level is the key of the level the snapshot was made in
+Snapshot = namedtuple("Snapshot", [
+    "level", "ticks", "scroll_x", "random", "next_checkpoint", "player", "entities", "chunks",
+    "gone", "elsewhere", "saved", "displaced", "kinematics", "swarm", "bullets", "free_bullets",
+    "particles",
+])
+
+
+# All images for bullet, oponnents and hero,
+# other versions of them are made by the cache
+images = ImageCache()
+images.add("hero", load_image("hero.png", (50, 60)))
+images.add("enemy", load_image("enemy.png", (50, 40)))
+images.add("fly", load_image("enemy2.png", (50, 40)))
+images.add("flag", load_image("flag.png", (50, 60)))
+images.add("platform", load_image("pixel.png"))
+images.add("bullet", load_image("bullet.png", (60, 30)))
+images.add("coin", load_image("coin.png", (40, 40)))
+
+
+def preload_images():
+    """
+    Flipped versions which are used all the time
+    """
+    for name in ("hero", "enemy", "fly", "bullet"):
+        images.preload(name, flip_x=True)
+
+
+def convert_images():
+    """
+    Converting images for faster drawing,
+    it can be used only when the window exists
+    """
+    images.convert()
+
+
+preload_images()
+
+# Classes
+
+
+class Platform(pygame.sprite.Sprite):
+    """
+    Represents a static map element
+    """
+    _layer = 0  # Drawing order
+    passive = True  # ActivityGroup does not update it
+    static = True  # Never moves, it is drawn baked with other platforms
+    # Static platforms keep them, moving platforms set their own
+    direction = 0
+    kinematics = None
+    # How far the platform moved in the last tick when it is not in kinematics
+    last_move = (0, 0)
+
+    def __init__(self, x, y, width, height):
+        """
+        Creating platform, it has no image of its own
+        """
+        super().__init__()
+        self.rect = pygame.Rect(x, y, width, height)
+
+    @property
+    def image(self):
+        """
+        Scaled image from the cache, platforms of every size would
+        keep their pixels in memory, most of them are only baked once
+        """
+        return images.get("platform", scale=self.rect.size)
+
+    @property
+    def velocity(self):
+        """
+        How far the platform moved in the last tick
+        """
+        if self.kinematics is not None:
+            return self.kinematics.velocity(self)
+        return self.last_move
+
+    def moved(self):
+        """
+        Telling spatial groups that platform changed its place
+        """
+        for group in self.groups():
+            if isinstance(group, SpatialGroup):
+                group.moved(self)
+
+    def sync(self, x, y, direction):
+        """
+        Taking position from the kinematics of the world
+        """
+        self.rect.x = x
+        self.rect.y = y
+        self.direction = direction
+
+    def save_state(self):
+        """
+        Place of the platform for snapshots, static platforms have nothing to save
+        """
+        if self.static:
+            return None
+        return self.rect.x, self.rect.y, self.direction
+
+    def load_state(self, state):
+        self.rect.x, self.rect.y, self.direction = state
+
+    def kill(self):
+        if self.kinematics is not None:
+            self.kinematics.remove(self)
+        super().kill()
+
+
+class MovingPlatform_x(Platform):
+    """
+    Platoform moving horizontally
+    """
+    static = False
+
+    def __init__(self, x, y, width, height, range_dist=100, speed=PLATFORM_SPEED_X):
+        """
+        Function which define platform move
+        """
+        super().__init__(x, y, width, height)
+        self.start_x = x
+        self.range_dist = range_dist
+        self.move_speed = speed
+        self.direction = 1
+
+    def update(self):
+        """
+        Handles platform movement and directional switching.
+        Kinematics of the world does the same for all platforms at once,
+        this one is used when the platform is not in it
+        """
+        self.last_move = (self.move_speed * self.direction, 0)
+        self.rect.x += self.last_move[0]
+        if self.rect.x > self.start_x + self.range_dist:
+            self.direction = -1
+        elif self.rect.x < self.start_x:
+            self.direction = 1
+        self.moved()
+
+    def catch_up(self, ticks):
+        """
+        Moving platform to the place it would be after sleeping
+        """
+        self.rect.x, self.direction = patrol_after(self.rect.x, self.direction, self.start_x,
+                                                   self.range_dist, self.move_speed, ticks)
+        self.moved()
+
+    def register(self, kinematics):
+        self.kinematics = kinematics
+        kinematics.add_patrol(self, PATROL_X, self.start_x, self.range_dist, self.move_speed, self.direction)
+
+
+class MovingPlatform_y(Platform):
+    """
+    Platoform moving vertically
+    """
+    static = False
+
+    def __init__(self, x, y, width, height, range_dist=100, speed=PLATFORM_SPEED_Y):
+        """
+        Function which define platform move
+        """
+        super().__init__(x, y, width, height)
+        self.start_y = y
+        self.range_dist = range_dist
+        self.move_speed = speed
+        self.direction = 1
+
+    def update(self):
+        """
+        Handles platform movement and directional switching.
+        Kinematics of the world does the same for all platforms at once,
+        this one is used when the platform is not in it
+        """
+        self.last_move = (0, self.move_speed * self.direction)
+        self.rect.y += self.last_move[1]
+        if self.rect.y > self.start_y + self.range_dist:
+            self.direction = -1
+        elif self.rect.y < self.start_y:
+            self.direction = 1
+        self.moved()
+
+    def catch_up(self, ticks):
+        """
+        Moving platform to the place it would be after sleeping
+        """
+        self.rect.y, self.direction = patrol_after(self.rect.y, self.direction, self.start_y,
+                                                   self.range_dist, self.move_speed, ticks)
+        self.moved()
+
+    def register(self, kinematics):
+        self.kinematics = kinematics
+        kinematics.add_patrol(self, PATROL_Y, self.start_y, self.range_dist, self.move_speed, self.direction)
+
+
+class Coin(pygame.sprite.Sprite):
+    """
+    Class which defines coin as a objects possible to collect
+    """
+    _layer = 3  # Drawing order
+    passive = True  # Moved by kinematics of the world
+
+    def __init__(self, x, y):
+        """
+        Coin creating
+        """
+        super().__init__()
+        self.image = images.get("coin")
+        self.rect = self.image.get_rect()
+        self.rect.center = (x, y)
+        self.start_y = y
+        self.ticks = 0
+        self.kinematics = None
+
+    def update(self):
+        """
+        Animation for coin, kinematics of the world does the same
+        for all coins at once
+        """
+        # Timer counted from ticks, so sleeping coins can catch up
+        self.ticks += 1
+        self.rect.y = self.start_y + math.sin(self.ticks * 0.1) * 5
+
+    def catch_up(self, ticks):
+        """
+        Skipping ticks when coin was sleeping
+        """
+        self.ticks += ticks
+
+    def register(self, kinematics):
+        self.kinematics = kinematics
+        kinematics.add_bob(self, self.start_y, self.ticks)
+
+    def sync(self, x, y, direction):
+        self.rect.y = y
+
+    def save_state(self):
+        return self.rect.y, self.ticks
+
+    def load_state(self, state):
+        self.rect.y, self.ticks = state
+
+    def kill(self):
+        if self.kinematics is not None:
+            self.kinematics.remove(self)
+        super().kill()
+
+
+class Bullet(pygame.sprite.Sprite):
+    """
+    Class for bullets which our hero is using to kill enemies,
+    they are created once by the pool and used again
+    """
+    _layer = 5  # Drawing order
+
+    def __init__(self, pool):
+        """
+        Creating bullet
+        """
+        super().__init__()
+        self.pool = pool
+        self.image_right = images.get("bullet")
+        self.image_left = images.get("bullet", flip_x=True)
+        self.image = self.image_right
+        self.rect = self.image.get_rect()
+        self.speed = 0
+        self.map_length = MAP_LENGTH
+
+    def reset(self, x, y, direction, map_length):
+        """
+        Shooting bullet again from (x, y)
+        """
+        self.rect.center = (x, y)
+        self.speed = BULLET_SPEED * direction
+        self.map_length = map_length
+        if direction == -1:  # Flip bullet sprite if the player is facing left.
+            self.image = self.image_left
+        else:
+            self.image = self.image_right
+
+    def save_state(self):
+        return self.rect.x, self.rect.y, self.speed, self.map_length
+
+    def load_state(self, state):
+        self.rect.x, self.rect.y, self.speed, self.map_length = state
+        self.image = self.image_left if self.speed < 0 else self.image_right
+
+    def kill(self):
+        """
+        Removing bullet and giving it back to the pool
+        """
+        if self.alive():
+            super().kill()
+            self.pool.release(self)
+
+    def update(self):
+        """
+        Removing bullets when they are too far behind the map
+        """
+        self.rect.x += self.speed
+        if self.rect.x < -100 or self.rect.x > self.map_length + 1000:
+            self.kill()
+
+
+class Player(pygame.sprite.Sprite):
+    """
+    Class for our hero
+    """
+    always_active = True
+    _layer = 1  # Drawing order
+
+    def __init__(self, world):
+        """
+        Hero creating
+        """
+        super().__init__()
+        self.image_right = images.get("hero")
+        self.image_left = images.get("hero", flip_x=True)
+        self.image = self.image_right
+        self.rect = self.image.get_rect()
+        self.rect.inflate_ip(-15, 0)
+        self.world = world
+        self.platforms = world.platforms
+        self.bullets = world.bullets
+
+        # Setup of hero
+        self.start_pos = (100, 400)
+        self.rect.x = self.start_pos[0]
+        self.rect.y = self.start_pos[1]
+        self.speed = PLAYER_SPEED
+        self.on_ground = False
+        self.velocity_y = 0
+        self.facing_right = True
+
+        # Shooting delay is counted in ticks of the world, not in real time
+        self.last_shot_tick = world.ticks
+        self.ammo = 1
+
+    def save_state(self):
+        """
+        Everything about the hero for snapshots
+        """
+        return (self.rect.x, self.rect.y, self.velocity_y, self.on_ground,
+                self.facing_right, self.ammo, self.last_shot_tick)
+
+    def load_state(self, state):
+        (self.rect.x, self.rect.y, self.velocity_y, self.on_ground,
+         self.facing_right, self.ammo, self.last_shot_tick) = state
+        self.image = self.image_right if self.facing_right else self.image_left
+
+    def shoot(self):
+        """
+        Function for shooting
+        """
+        now = self.world.ticks
+        if now - self.last_shot_tick > SHOOT_DELAY_TICKS:  # Delay for shooting
+            if self.ammo > 0:
+                if self.facing_right:
+                    direction = 1
+                else:
+                    direction = -1
+                # When all bullets are flying we can not shoot
+                bullet = self.world.bullet_pool.acquire(self.rect.centerx, self.rect.centery, direction,
+                                                        self.world.map_length)
+                if bullet is None:
+                    return
+                self.last_shot_tick = now
+                self.ammo -= 1
+                self.world.all_sprites.add(bullet)
+                self.bullets.add(bullet)
+                self.world.events.append("shoot")
+
+    def move_x(self, dx):
+        """
+        Moving hero sideways until the first wall on his way,
+        platforms low enough to step on are not walls
+        """
+        target = self.rect.copy()
+        target.x += dx
+        dx = target.x - self.rect.x
+        if dx == 0:
+            return
+        bottom = self.rect.bottom
+        wall, _ = first_impact(self.rect, dx, 0, self.platforms.collide(self.rect.union(target)),
+                               skip=lambda platform: bottom <= platform.rect.top + STEP_HEIGHT)
+        if wall is None:
+            self.rect.x = target.x
+        elif dx > 0:
+            self.rect.right = wall.rect.left
+        else:
+            self.rect.left = wall.rect.right
+
+    def update(self):
+        """
+        Controls for main character
+        """
+        keys = self.world.inputs
+        dx = 0
+        if keys.left:
+            dx = -self.speed
+            self.image = self.image_left
+            self.facing_right = False
+        if keys.right:
+            dx = self.speed
+            self.image = self.image_right
+            self.facing_right = True
+        if keys.space:
+            self.shoot()
+        if keys.up and self.on_ground:
+            self.velocity_y = PLAYER_JUMP
+            self.on_ground = False
+            self.world.events.append("jump")
+
+        # Rules for horizontal movement
+        self.move_x(dx)
+
+        # Rules for vertical movement, the whole way is checked,
+        # so fast falls do not go through thin platforms
+        self.velocity_y += PLAYER_GRAVITY
+        target = self.rect.copy()
+        target.y += self.velocity_y
+        dy = target.y - self.rect.y
+        self.on_ground = False
+        # Falling hero looks for the ground a bit below, so he stays on platforms going down
+        reach = dy + STEP_HEIGHT if self.velocity_y >= 0 else dy
+        path = self.rect.union(self.rect.move(0, reach))
+        platform, _ = first_impact(self.rect, 0, reach, self.platforms.collide(path))
+        if platform is not None and self.velocity_y > 0:
+            self.rect.bottom = platform.rect.top
+            self.velocity_y = 0
+            self.on_ground = True
+            # Riding moving platforms
+            if isinstance(platform, MovingPlatform_x):
+                self.move_x(platform.velocity[0])
+        elif platform is not None and self.velocity_y < 0:
+            self.rect.top = platform.rect.bottom
+            self.velocity_y = 0
+        else:
+            self.rect.y = target.y
+        # Invisible barriers
+        if self.rect.x < 0:
+            self.rect.x = 0
+        if self.rect.x > self.world.map_length + 200:
+            self.rect.x = self.world.map_length + 200
+
+
+class Enemy(pygame.sprite.Sprite):
+    """
+    Class for basic opponents
+    """
+    _layer = 2  # Drawing order
+    passive = True  # Moved by kinematics of the world
+
+    def __init__(self, x, y, distance, speed=2):
+        """
+        Creating basic opponents
+        """
+        super().__init__()
+        self.image = images.get("enemy")
+        self.rect = self.image.get_rect()
+        self.rect.x = x
+        self.rect.bottom = y
+        self.start_x = x
+        self.max_dist = distance
+        self.direction = 1
+        self.speed = speed
+        self.kinematics = None
+
+    def update(self):
+        """
+        Updating their movements, kinematics of the world does the same
+        for all enemies at once, this one is used when the enemy is not in it
+        """
+        self.rect.x += self.speed * self.direction
+        if self.rect.x > self.start_x + self.max_dist:
+            self.direction = -1
+            self.image = images.get("enemy", flip_x=True)
+        elif self.rect.x < self.start_x:
+            self.direction = 1
+            self.image = images.get("enemy")
+
+    def catch_up(self, ticks):
+        """
+        Moving enemy to the place it would be after sleeping
+        """
+        x, direction = patrol_after(self.rect.x, self.direction, self.start_x, self.max_dist, self.speed, ticks)
+        self.sync(x, self.rect.y, direction)
+
+    def register(self, kinematics):
+        self.kinematics = kinematics
+        kinematics.add_patrol(self, PATROL_X, self.start_x, self.max_dist, self.speed, self.direction)
+
+    def sync(self, x, y, direction):
+        """
+        Taking position from the kinematics, enemy looks where it goes
+        """
+        self.rect.x = x
+        self.direction = direction
+        self.image = images.get("enemy", flip_x=direction < 0)
+
+    def save_state(self):
+        return self.rect.x, self.direction
+
+    def load_state(self, state):
+        self.sync(state[0], self.rect.y, state[1])
+
+    def kill(self):
+        if self.kinematics is not None:
+            self.kinematics.remove(self)
+        super().kill()
+
+
+class FlyEnemy(pygame.sprite.Sprite):
+    """
+    Class for fly enemy,
+    all flies are moved together by the swarm of the world
+    """
+    _layer = 2  # Drawing order
+    passive = True  # ActivityGroup does not update it
+
+    def __init__(self, swarm, x, y, speed_multiplier=1.0):
+        """
+        Creating fly enemy and its movement
+        """
+        super().__init__()
+        self.image = images.get("fly")
+        self.rect = self.image.get_rect()
+        self.rect.x = x
+        self.rect.y = y
+        self.facing_right = False
+        self.swarm = swarm
+        swarm.add(self, speed=1.5 * speed_multiplier)
+
+    def position(self):
+        return self.swarm.position(self)
+
+    def place(self, x, y):
+        self.swarm.place(self, x, y)
+
+    def sync(self, x, y, facing_right):
+        """
+        Taking position from the swarm when fly can be seen
+        """
+        self.rect.x = x
+        self.rect.y = y
+        # Flipping fly if needed
+        self.facing_right = facing_right
+        self.image = images.get("fly", flip_x=facing_right)
+
+    def save_state(self):
+        return self.rect.x, self.rect.y, self.facing_right
+
+    def load_state(self, state):
+        self.sync(*state)
+
+    def kill(self):
+        self.swarm.remove(self)
+        super().kill()
+
+
+class Flag(pygame.sprite.Sprite):
+    """
+    Class for flag - our main goal
+    """
+    _layer = 4  # Drawing order
+    passive = True  # Never moves
+
+    def __init__(self, x, y):
+        """
+        Creating flag
+        """
+        super().__init__()
+        self.image = images.get("flag")
+        self.rect = self.image.get_rect()
+        self.rect.x = x
+        self.rect.bottom = y
+
+
+class World:
+    """
+    Whole game without window, sounds and fonts,
+    every step moves it forward by one tick
+    """
+    def __init__(self, level=None, seed=None, checkpoint_distance=None):
+        """
+        All actors and objects,
+        with the same seed and inputs the world always does the same.
+        With checkpoint_distance the hero starts again from the last
+        checkpoint he reached, checkpoints are this many pixels apart
+        """
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.all_sprites = ActivityGroup()
+        self.platforms = SpatialGroup()
+        self.enemies = pygame.sprite.Group()
+        self.goals = pygame.sprite.Group()
+        self.bullets = pygame.sprite.Group()
+        self.coins = pygame.sprite.Group()
+        self.particles = ParticleSystem(gravity=GRAVITY_PARTICLE, rng=self.random)
+        self.bullet_pool = Pool(Bullet, BULLET_POOL_SIZE)
+        self.swarm = Swarm()
+        self.kinematics = Kinematics()
+        # Groups of sprites made from every kind of level record, shared by all of them,
+        # static platforms are drawn baked, only the hero looks for them
+        self.kind_groups = {
+            PLATFORM: (self.platforms,),
+            MOVING_X: (self.platforms, self.all_sprites),
+            MOVING_Y: (self.platforms, self.all_sprites),
+            ENEMY: (self.enemies, self.all_sprites),
+            FLYER: (self.enemies, self.all_sprites),
+            COIN: (self.coins, self.all_sprites),
+            GOAL: (self.goals, self.all_sprites),
+        }
+
+        self.player = None
+        self.scroll_x = 0
+        self.ticks = 0
+        self.game_state = "MENU"
+        # Level file made by level.py, or level from the code
+        if level is None:
+            if os.path.exists(LEVEL_FILE):
+                level = Level.open(LEVEL_FILE)
+            else:
+                level = Level.from_records(builtin_records())
+        self.level = level
+        self.map_length = level.length
+        # Sprites of every chunk which exists, by column,
+        # and (column, spawner, sprites made so far) of the chunk which is made ahead
+        self.chunks = {}
+        self.prefetch = None
+        # Every sprite made from the level, by number of its record
+        self.sprites = {}
+        # Numbers of records which were killed or collected, they never come back
+        self.gone = set()
+        # Flies do not stay in their chunk, numbers of flies which are made
+        # from saved places instead of their records
+        self.elsewhere = set()
+        # Saved places of flies and numbers of flies saved in every column
+        self.saved = {}
+        self.displaced = {}
+        self.inputs = Inputs()
+        # Names of things which happened during the tick, e.g. "shoot" or "win"
+        self.events = []
+        # FrameProfiler from main.py, only while it is enabled
+        self.profiler = None
+        # Level made by the first start, restarts put the world back to it
+        self.start = None
+        self.checkpoint = None
+        self.checkpoint_distance = checkpoint_distance
+        self.next_checkpoint = checkpoint_distance
+
+    def create_particles(self, x, y, color, amount=10):
+        """
+        Creating explosions
+        """
+        self.particles.emit(x, y, color, amount)
+
+    def init_level(self):
+        """
+        Creating level
+        """
+        self.events.append("start")
+
+        self.all_sprites.empty()
+        self.platforms.empty()
+        self.enemies.empty()
+        self.goals.empty()
+        self.bullets.empty()
+        self.coins.empty()
+        self.particles.clear()
+        self.swarm.clear()
+        self.kinematics.clear()
+        self.bullet_pool.release_all()
+
+        self.scroll_x = 0
+        self.ticks = 0
+        # Setting current game state
+        self.game_state = "GAME"
+
+        self.player = Player(self)
+        self.all_sprites.add(self.player)
+        self.checkpoint = None
+        self.next_checkpoint = self.checkpoint_distance
+        # Only the part of the level near the hero is created
+        self.chunks.clear()
+        self.prefetch = None
+        self.sprites.clear()
+        self.gone.clear()
+        self.elsewhere.clear()
+        self.saved.clear()
+        self.displaced.clear()
+        self.load_near()
+
+    def make_sprite(self, record):
+        """
+        Sprite of one level record, it is not in any group yet
+        """
+        kind, x, y, w, h, a, b, f = record
+        if kind == PLATFORM:
+            return Platform(x, y, w, h)
+        if kind == MOVING_X:
+            return MovingPlatform_x(x, y, w, h, range_dist=a, speed=b)
+        if kind == MOVING_Y:
+            return MovingPlatform_y(x, y, w, h, range_dist=a, speed=b)
+        if kind == ENEMY:
+            return Enemy(x, y, a, b)
+        if kind == FLYER:
+            return FlyEnemy(self.swarm, x, y, speed_multiplier=f)
+        if kind == COIN:
+            return Coin(x, y)
+        if kind == GOAL:
+            return Flag(x, y)
+        raise ValueError(f"Unknown level record {kind}")
+
+    def spawn(self, record, number=None):
+        """
+        Creating sprite from one level record,
+        number is the place of the record in the level
+        """
+        return self.add_sprite(self.make_sprite(record), record[0], number)
+
+    def add_sprite(self, sprite, kind, number=None):
+        """
+        Putting sprite made by make_sprite into its groups and batches
+        """
+        # Sprites created later must be where they would be from the start
+        if self.ticks and hasattr(sprite, "catch_up"):
+            sprite.catch_up(self.ticks)
+        if hasattr(sprite, "register"):
+            sprite.register(self.kinematics)
+        sprite.record_number = number
+        sprite.home_groups = groups = self.kind_groups[kind]
+        sprite.add(*groups)
+        if number is not None:
+            self.sprites[number] = sprite
+        return sprite
+
+    def load_near(self):
+        """
+        Creating chunks of the level which came near the camera or the hero
+        and removing chunks far behind them
+        """
+        level = self.level
+        chunks = self.chunks
+        left = min(int(self.scroll_x), self.player.rect.x)
+        right = max(int(self.scroll_x) + SCREEN_WIDTH, self.player.rect.right)
+        # Chunks of awake sprites are made at once only when the level starts,
+        # after restore, or when the hero runs faster than chunks are made below.
+        # A column gets 512 / PLAYER_SPEED ticks of LOAD_BUDGET before that
+        for column in level.region_columns(left - ACTIVITY_RADIUS, right + ACTIVITY_RADIUS):
+            if column not in chunks:
+                self.load_chunk(column)
+
+        # Next chunk is made before it is needed, few sprites every tick
+        near = set(level.region_columns(left - LOAD_RADIUS, right + LOAD_RADIUS))
+        if self.prefetch is None:
+            ahead = level.region_columns(left - PREFETCH_RADIUS, right + PREFETCH_RADIUS)
+            missing = [column for column in ahead if column not in chunks]
+            if missing:
+                # Chunks needed soon first, then the nearest one, the ones on the right before the left
+                middle = level.column_of(left)
+                column = min(missing, key=lambda column: (column not in near, column < middle, abs(column - middle)))
+                made = []
+                self.prefetch = (column, self.chunk_spawner(column, made), made)
+        if self.prefetch is not None:
+            column, spawner, made = self.prefetch
+            budget = LOAD_BUDGET if column in near else PREFETCH_BUDGET
+            used = 0
+            for cost in spawner:
+                used += cost
+                if used >= budget:
+                    break
+            if column in chunks:
+                self.prefetch = None
+
+        keep = set(level.region_columns(left - RELEASE_RADIUS, right + RELEASE_RADIUS))
+        far = [column for column in chunks if column not in keep]
+        for column in far[:RELEASES_PER_TICK]:
+            self.release_chunk(column)
+
+    def load_chunk(self, column):
+        """
+        Making whole chunk at once, it is needed now.
+        The chunk made ahead is finished when it is this one
+        """
+        if self.prefetch is not None and self.prefetch[0] == column:
+            spawner = self.prefetch[1]
+            self.prefetch = None
+        else:
+            spawner = self.chunk_spawner(column, [])
+        for _ in spawner:
+            pass
+
+    def chunk_spawner(self, column, sprites):
+        """
+        Creating sprites of one column one by one into sprites, with flies
+        which were saved there, the chunk exists when the last one is made.
+        Guessed cost of every sprite is given back after it is made
+        """
+        for number, record in self.level.column(column):
+            if number not in self.gone and number not in self.elsewhere:
+                sprites.append(self.spawn(record, number))
+                yield SPAWN_COSTS[record[0]]
+        # Flies can be saved here while the chunk is being made
+        while self.displaced.get(column):
+            number = self.displaced[column].pop()
+            sprite = self.spawn(self.level.record(number), number)
+            sprite.place(*self.saved.pop(number))
+            sprites.append(sprite)
+            yield SPAWN_COSTS[FLYER]
+        self.displaced.pop(column, None)
+        self.chunks[column] = sprites
+
+    def release_chunk(self, column):
+        """
+        Removing sprites of one column, patrols and coins are made again
+        from their records, flies remember where they are
+        """
+        for sprite in self.chunks.pop(column):
+            if not sprite.alive():
+                self.sprites.pop(sprite.record_number, None)
+                continue
+            if isinstance(sprite, FlyEnemy):
+                x, y = sprite.position()
+                here = self.level.column_of(x)
+                self.elsewhere.add(sprite.record_number)
+                if here in self.chunks:
+                    # Fly flew to a chunk which stays
+                    self.chunks[here].append(sprite)
+                    continue
+                self.saved[sprite.record_number] = (x, y)
+                self.displaced.setdefault(here, []).append(sprite.record_number)
+            sprite.kill()
+            self.sprites.pop(sprite.record_number, None)
+
+    def snapshot(self):
+        """
+        State of everything what can change, without images,
+        restore puts the world back to it.
+        Chunk which is made ahead is not saved, it is made again later,
+        flies which were saved there stay saved
+        """
+        all_order = self.all_sprites.grid.order
+        platform_order = self.platforms.grid.order
+        entities = {}
+        chunks = {}
+        for column, chunk in self.chunks.items():
+            numbers = []
+            for sprite in chunk:
+                if not sprite.alive():
+                    continue
+                number = sprite.record_number
+                save = getattr(sprite, "save_state", None)
+                entities[number] = (save() if save else None, all_order.get(sprite), platform_order.get(sprite))
+                numbers.append(number)
+            chunks[column] = tuple(numbers)
+        saved = dict(self.saved)
+        displaced = {column: list(numbers) for column, numbers in self.displaced.items()}
+        if self.prefetch is not None:
+            column, spawner, made = self.prefetch
+            for sprite in made:
+                if sprite.alive() and sprite.record_number in self.elsewhere:
+                    saved[sprite.record_number] = self.swarm.position(sprite)
+                    displaced.setdefault(column, []).append(sprite.record_number)
+        pool = self.bullet_pool
+        index = {bullet: i for i, bullet in enumerate(pool.items)}
+        return Snapshot(
+            level=self.level.key,
+            ticks=self.ticks,
+            scroll_x=self.scroll_x,
+            random=self.random.getstate(),
+            next_checkpoint=self.next_checkpoint,
+            player=self.player.save_state(),
+            entities=entities,
+            chunks=chunks,
+            gone=frozenset(self.gone),
+            elsewhere=frozenset(self.elsewhere),
+            saved=saved,
+            displaced={column: tuple(numbers) for column, numbers in displaced.items()},
+            kinematics=self.kinematics.save_state(entities),
+            swarm=self.swarm.save_state(entities),
+            bullets=[(index[bullet], bullet.save_state(), all_order[bullet]) for bullet in self.bullets],
+            free_bullets=[index[bullet] for bullet in pool.free],
+            particles=self.particles.save_state(),
+        )
+
+    def restore(self, snapshot, keep_random=False):
+        """
+        Putting the world back to the snapshot in place, sprites which exist
+        are used again, sprites removed since then are made again from records.
+        With keep_random random numbers go on, like after a new start
+        """
+        if snapshot.level != self.level.key:
+            raise ValueError("Snapshot is from another level")
+        self.game_state = "GAME"
+        self.ticks = snapshot.ticks
+        self.scroll_x = snapshot.scroll_x
+        self.next_checkpoint = snapshot.next_checkpoint
+        if not keep_random:
+            self.random.setstate(snapshot.random)
+
+        # Sprites which were not there go away, the chunk made ahead too
+        entities = snapshot.entities
+        for number, sprite in list(self.sprites.items()):
+            if number not in entities:
+                sprite.kill()
+                del self.sprites[number]
+        self.prefetch = None
+        all_order = self.all_sprites.grid.order
+        platform_order = self.platforms.grid.order
+        for number, (state, order, platform_key) in entities.items():
+            sprite = self.sprites.get(number)
+            if sprite is None:
+                sprite = self.spawn(self.level.record(number), number)
+            if state is not None:
+                sprite.load_state(state)
+            if not sprite.alive():
+                sprite.add(*sprite.home_groups)
+            # Same order as in the snapshot, so collisions give the same results
+            if order is not None:
+                all_order[sprite] = order
+                self.all_sprites.moved(sprite)
+            if platform_key is not None:
+                platform_order[sprite] = platform_key
+                self.platforms.moved(sprite)
+        self.chunks = {column: [self.sprites[number] for number in numbers]
+                       for column, numbers in snapshot.chunks.items()}
+        self.gone = set(snapshot.gone)
+        self.elsewhere = set(snapshot.elsewhere)
+        self.saved = dict(snapshot.saved)
+        self.displaced = {column: list(numbers) for column, numbers in snapshot.displaced.items()}
+        self.kinematics.load_state(snapshot.kinematics, self.sprites)
+        self.swarm.load_state(snapshot.swarm, self.sprites)
+
+        self.player.load_state(snapshot.player)
+        self.all_sprites.moved(self.player)
+        pool = self.bullet_pool
+        for bullet in self.bullets.sprites():
+            # Not Bullet.kill, free bullets are put back below
+            pygame.sprite.Sprite.kill(bullet)
+        for i, state, order in snapshot.bullets:
+            bullet = pool.items[i]
+            bullet.load_state(state)
+            bullet.add(self.all_sprites, self.bullets)
+            all_order[bullet] = order
+        pool.free[:] = [pool.items[i] for i in snapshot.free_bullets]
+        self.particles.load_state(snapshot.particles)
+
+    def restart(self):
+        """
+        Starting again from the last checkpoint, or from the start after
+        winning. The first start creates the level and remembers it,
+        later starts only put the world back
+        """
+        if self.game_state == "WIN":
+            self.checkpoint = None
+        snapshot = self.checkpoint or self.start
+        if snapshot is None:
+            self.init_level()
+            self.start = self.snapshot()
+        else:
+            self.restore(snapshot, keep_random=True)
+            self.events.append("start")
+
+    def save_checkpoint(self):
+        """
+        Remembering the world when the hero stands behind the next checkpoint
+        """
+        player = self.player
+        if player.on_ground and player.rect.x >= self.next_checkpoint:
+            distance = self.checkpoint_distance
+            self.next_checkpoint = (player.rect.x // distance + 1) * distance
+            self.checkpoint = self.snapshot()
+            self.events.append("checkpoint")
+
+    def step(self, inputs):
+        """
+        One tick of the game,
+        returns list of events which happened
+        """
+        self.inputs = inputs
+        self.events = []
+        if self.game_state == "GAME":
+            self.update_game()
+        elif inputs.space:  # Start or restart option
+            self.restart()
+        return self.events
+
+    def update_game(self):
+        """
+        Moving all actors and checking collisions
+        """
+        self.update_sprites()
+        self.check_collisions()
+        if self.checkpoint_distance and self.game_state == "GAME":
+            self.save_checkpoint()
+            if self.profiler:
+                self.profiler.mark("checkpoint")
+
+    def update_sprites(self):
+        """
+        Moving actors near the camera and the camera itself
+        """
+        player = self.player
+        self.load_near()
+        # Patrols, moving platforms and coins move all at once,
+        # platforms near the hero must be in their places before he moves
+        self.kinematics.step()
+        self.sync_moved([player.rect.inflate(2 * DRAW_MARGIN, 2 * DRAW_MARGIN)])
+        # Sprites far from the camera and the hero are sleeping
+        active_rect = camera_rect(self.scroll_x, SCREEN_WIDTH, SCREEN_HEIGHT, ACTIVITY_RADIUS)
+        active_rect.union_ip(player.rect.inflate(2 * ACTIVITY_RADIUS, 2 * ACTIVITY_RADIUS))
+        self.all_sprites.update_active(active_rect)
+        self.ticks += 1
+        self.particles.update()
+        # Bullets which left the active region go back to the pool
+        for bullet in self.bullets.sprites():
+            if not active_rect.colliderect(bullet.rect):
+                bullet.kill()
+        # Following camera
+        target_scroll = player.rect.x - 300
+        self.scroll_x += (target_scroll - self.scroll_x) * 0.1
+        if self.scroll_x < 0:
+            self.scroll_x = 0
+        if self.scroll_x > self.map_length - 400:
+            self.scroll_x = self.map_length - 400
+        # Only sprites which can be drawn or hit get new rects,
+        # the hero and bullets are usually inside the view already
+        view_rect = camera_rect(self.scroll_x, SCREEN_WIDTH, SCREEN_HEIGHT, DRAW_MARGIN)
+        rects = [view_rect]
+        for rect in [player.rect] + [bullet.rect for bullet in self.bullets]:
+            if not view_rect.contains(rect):
+                rects.append(rect)
+        self.sync_moved(rects)
+        # Flies move all at once
+        for fly, x, y, facing_right in self.swarm.update(player.rect.centerx, player.rect.centery, rects):
+            fly.sync(x, y, facing_right)
+            self.all_sprites.moved(fly)
+        if self.profiler:
+            self.profiler.mark("update")
+
+    def sync_moved(self, rects):
+        """
+        Giving new rects to sprites of the kinematics
+        which are or were inside any of rects
+        """
+        for sprite, x, y, direction in self.kinematics.sync(rects):
+            sprite.sync(x, y, direction)
+            self.all_sprites.moved(sprite)
+            self.platforms.moved(sprite)
+
+    def check_collisions(self):
+        """
+        Hits of bullets, collecting coins, death and victory
+        """
+        player = self.player
+        profiler = self.profiler
+        enemies = self.enemies
+        # Grid of all sprites finds what touches the hero and every bullet,
+        # results are in the same order as groups give them
+        touching_player = self.all_sprites.collide(player.rect)
+        hits = {}
+        for bullet in self.bullets.sprites():
+            hit_enemies = [sprite for sprite in self.all_sprites.collide(bullet.rect) if sprite in enemies]
+            if hit_enemies:
+                hits[bullet] = hit_enemies
+                bullet.kill()
+
+        # Bullets and effects
+        for bullet, hit_enemies in hits.items():
+            for enemy in hit_enemies:
+                if -100 < enemy.rect.x - self.scroll_x < SCREEN_WIDTH + 100:
+                    # Killing effect
+                    self.create_particles(enemy.rect.centerx, enemy.rect.centery, "green", 15)
+                    enemy.kill()
+                    self.gone.add(enemy.record_number)
+                    self.events.append("hit")
+        if profiler:
+            profiler.mark("collide_bullets")
+
+        # Collecting coins
+        collected_coins = [sprite for sprite in touching_player if sprite in self.coins]
+        for coin in collected_coins:
+            coin.kill()
+            self.gone.add(coin.record_number)
+            # Collecting effect
+            self.create_particles(coin.rect.centerx, coin.rect.centery, "gold", 10)
+            player.ammo += 1
+            self.events.append("coin")
+        if profiler:
+            profiler.mark("collide_coins")
+
+        # Enemies killed by bullets are not in the group anymore
+        if any(sprite in enemies for sprite in touching_player):
+            self.lose()
+
+        if player.rect.y > SCREEN_HEIGHT:
+            self.lose()
+        if profiler:
+            profiler.mark("collide_enemies")
+
+        if any(sprite in self.goals for sprite in touching_player):
+            self.game_state = "WIN"
+            self.events.append("win")
+        if profiler:
+            profiler.mark("collide_goal")
+
+    def pool_stats(self):
+        """
+        How many bullets and particles are used,
+        the most used at once and how many times they were missing
+        """
+        return {
+            "bullets": self.bullet_pool.stats(),
+            "particles": self.particles.stats(),
+        }
+
+    def lose(self):
+        """
+        Hero died
+        """
+        self.game_state = "LOSE"
+        self.events.append("lose")